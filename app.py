@@ -1,6 +1,5 @@
 # app.py  (final, replace your current file with this)
 import os
-from datetime import timedelta
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -8,27 +7,72 @@ import streamlit as st
 import streamlit.components.v1 as components
 from streamlit_folium import st_folium
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import credentials, auth
 from streamlit_option_menu import option_menu
 
 from auth_ui import initialize_session_state, signup_form, login_form, show_user_info, notification_center
-from modules.data_loader import load_data, preprocess
+from config import COLUMNAR_MAP_MIN_ROWS
+from modules.data_loader import load_data, preprocess, fingerprint
 from modules.analysis import (
     agg_calls_by_day, agg_calls_by_hour, category_distribution, compute_kpis,
     interpret_time_series, interpret_hourly_distribution
 )
-from modules.mapping import pydeck_points_map, pydeck_heatmap, pydeck_hexbin_map
-from modules.festivals_ics import fetch_festivals_from_ics
+from modules.jurisdictions import check_jurisdictions, UNASSIGNED
+from modules.coverage import get_station_coverage, get_stations, STATIONS_PATH, FAR_FROM_STATION_KM
+from modules.spatial_index import get_spatial_index, filter_mask
+from modules.density import get_kde_raster
+from modules.animation import get_time_frames, frame_label, FRAME_MINUTES_OPTIONS
+from modules.mapping import get_map_deck, pydeck_frame_map, pydeck_points_map
+from modules.festivals_ics import fetch_festivals_from_ics, calendar_version
+from modules.festival_index import get_festival_index, get_festival_day_map
 from modules.festivals_utils import filter_significant_festivals
-from modules.ui_calendar import render_month_calendar
+from modules.event_study import get_event_study
+from modules.allocation_optimizer import get_week_plan, resources_without_demand, RESOURCE_DEMAND_CATEGORIES
+from modules.allocations import add_allocations, allocation_log_version, export_allocations_xlsx
+from modules.allocation_coverage import get_allocation_coverage, coverage_by_jurisdiction, RESPONSE_SLA_MIN
+from modules.staffing import get_staffing, TARGET_WAIT_PROBABILITY, ON_SCENE_MIN
+from modules.response_sim import get_response_model, get_scenario, SIM_REPLICATIONS
+from modules.shifts import WEEKDAY_NAMES
+from modules.ui_calendar import get_month_calendar_html
+from modules.user_data import get_firestore_client
 
 # Initialize Firebase only once
 if not firebase_admin._apps:
     cred = credentials.Certificate("serviceAccountKey.json")
     firebase_admin.initialize_app(cred)
 
-# Firestore client
-db = firestore.client()
+# Firestore client (shared across sessions)
+db = get_firestore_client()
+
+# Seconds per frame while the time replay is playing
+REPLAY_TICK_S = 0.6
+
+def replay_player(frames, freq_min):
+    """One replay frame; while playing, each fragment tick advances the frame index in session_state."""
+    frame_key = f"replay_frame_{freq_min}"
+    last = frames["n_frames"] - 1
+    # The rerun that starts playback shows the current frame; ticks after it advance
+    if st.session_state.get("replay_playing") and not st.session_state.pop("replay_hold", False):
+        frame = st.session_state.get(frame_key, 0) + 1
+        st.session_state[frame_key] = min(frame, last)
+        if frame >= last:
+            st.session_state.replay_playing = False
+            st.rerun()
+
+    replay_col1, replay_col2 = st.columns([1, 3])
+    with replay_col1:
+        playing = st.session_state.get("replay_playing", False)
+        if st.button("⏸ Pause" if playing else "▶ Play", key="replay_play"):
+            st.session_state.replay_playing = not playing
+            st.session_state.replay_hold = True
+            if not playing and st.session_state.get(frame_key, 0) >= last:
+                st.session_state[frame_key] = 0
+            # Full rerun so the fragment picks up (or drops) its timer
+            st.rerun()
+    with replay_col2:
+        i = st.slider("Time of day", 0, last, format="%d", key=frame_key)
+    st.caption(f"{frame_label(frames, i)} — {int(frames['frame_totals'][i])} calls")
+    st.pydeck_chart(pydeck_frame_map(frames, i))
 
 def main():
     st.set_page_config(
@@ -99,6 +143,20 @@ def main():
         # -------------------------
         df = preprocess(df_raw)  # ensures date, hour, weekday columns exist
 
+        # Cross-check uploaded jurisdictions against boundary polygons (if available)
+        df = check_jurisdictions(df)
+        assign_from_coords = False
+        if "jurisdiction_mismatch" in df.columns:
+            n_mismatch = int(df["jurisdiction_mismatch"].sum())
+            if n_mismatch:
+                st.sidebar.warning(f"{n_mismatch} calls lie outside their stated jurisdiction")
+                assign_from_coords = st.sidebar.checkbox("Assign jurisdiction from coordinates", value=False)
+                if assign_from_coords:
+                    df = df.copy()
+                    df["jurisdiction"] = df["jurisdiction"].where(
+                        df["jurisdiction_geo"] == UNASSIGNED, df["jurisdiction_geo"]
+                    )
+
         # -------------------------
         # Sidebar filters (date range, category, jurisdiction)
         # -------------------------
@@ -121,20 +179,17 @@ def main():
             st.sidebar.warning(f"Could not fetch festival ICS: {e}")
             all_festivals = []
 
+        # One sorted interval index and day map per calendar version, shared by every query below
+        festival_version = (calendar_version(), len(all_festivals))
+        festival_index = get_festival_index(festival_version, all_festivals)
+
         if all_festivals:
-            # build festival map for the month of the selected start date
+            # calendar for the month of the selected start date
             sel_date = pd.to_datetime(date_range[0])
             year, month = sel_date.year, sel_date.month
 
-            festival_dates_map = {}
-            for name, fs, fe in all_festivals:
-                cur = pd.to_datetime(fs).date()
-                endd = pd.to_datetime(fe).date()
-                while cur <= endd:
-                    festival_dates_map.setdefault(cur.isoformat(), []).append(name)
-                    cur = cur + timedelta(days=1)
-
-            calendar_html = render_month_calendar(year, month, festival_dates_map)
+            festival_dates_map = get_festival_day_map(festival_version, festival_index)
+            calendar_html = get_month_calendar_html(year, month, festival_version, festival_dates_map)
             st.sidebar.markdown("### Festivals Calendar")
             with st.sidebar:
                 components.html(calendar_html, height=300)
@@ -143,26 +198,24 @@ def main():
         # -------------------------
         # Apply dataset filters to create df_filtered
         # -------------------------
-        mask = (
-            (pd.to_datetime(df["date"]) >= pd.to_datetime(date_range[0])) &
-            (pd.to_datetime(df["date"]) <= pd.to_datetime(date_range[1])) &
-            (df["category"].isin(selected_categories)) &
-            (df["jurisdiction"].isin(selected_jurisdictions))
-        )
+        mask = filter_mask(df, (date_range[0], date_range[-1]), selected_categories, selected_jurisdictions)
         df_filtered = df[mask].copy()
 
+        # Identifies the loaded dataset (by content) and the filtered selection in shared caches
+        dataset_key = fingerprint((metadata or {}).get("content_hash"), assign_from_coords)
+        filter_key = fingerprint(
+            dataset_key,
+            str(date_range[0]), str(date_range[-1]),
+            sorted(map(str, selected_categories)), sorted(map(str, selected_jurisdictions)),
+        )
+
         # -------------------------
         # Determine festivals in selected date range (all) and significant subset
         # -------------------------
         start_sel = pd.to_datetime(date_range[0])
         end_sel = pd.to_datetime(date_range[1])
 
-        festivals_in_range_all = []
-        for name, fs, fe in all_festivals:
-            fs_ts = pd.to_datetime(fs)
-            fe_ts = pd.to_datetime(fe)
-            if (start_sel <= fe_ts) and (end_sel >= fs_ts):
-                festivals_in_range_all.append((name, fs_ts, fe_ts))
+        festivals_in_range_all = festival_index.in_range(start_sel, end_sel)
 
         # --- Get the top 10 festivals by crime calls ---
         significant_festals_info = filter_significant_festivals(
@@ -174,14 +227,8 @@ def main():
         # -------------------------
         # Tag df_filtered rows with festival_name (for stacking & other use)
         # -------------------------
-        def tag_festival_for_row(ts, festivals_list):
-            for name, fs, fe in festivals_list:
-                if fs <= ts <= fe:
-                    return name
-            return "Non-Festival"
-
         # Tag all festivals first for general awareness
-        df_filtered["festival_name"] = df_filtered["call_ts"].apply(tag_festival_for_row, festivals_list=festivals_in_range_all)
+        df_filtered["festival_name"] = festival_index.tag(df_filtered["call_ts"])
 
         # --- MODIFIED: Create a specific column for the hourly chart ---
         # This column will only contain names of the top 10 festivals. Everything else is "Non-Festival".
@@ -219,28 +266,244 @@ def main():
         # Mapping
         # -------------------------
         st.markdown("## Spatial Mapping")
-        tab1, tab2, tab3 = st.tabs(["Points Map", "Hotspot Heatmap", "Hexbin Map"])
+        # Only the selected view is built; decks are memoised on the filter fingerprint
+        map_views = {
+            "Points Map": ("points", "No valid coordinates to plot."),
+            "Hotspot Heatmap": ("density", "No valid coordinates to plot heatmap."),
+            "Hexbin Map": ("hexbin", "No valid coordinates to plot hexbin hotspots."),
+            "Time Replay": ("replay", "No valid calls to replay."),
+        }
+        map_view = st.radio("Map view", list(map_views.keys()), horizontal=True,
+                            key="map_view", label_visibility="collapsed")
+        map_kind, empty_message = map_views[map_view]
+
+        # Large selections ship typed columnar positions instead of JSON records
+        columnar_maps = len(df_filtered) >= COLUMNAR_MAP_MIN_ROWS
+        if map_kind == "replay":
+            # Frames are binned once per filter selection; stepping only slices them
+            freq_min = st.selectbox("Frame size (minutes)", FRAME_MINUTES_OPTIONS, key="replay_freq")
+            frames = get_time_frames(filter_key, df_filtered, freq_min)
+            if frames["max_count"] == 0:
+                st.info(empty_message)
+            else:
+                # While playing, only the fragment reruns on its timer; the rest of the page is left alone
+                replay_every = REPLAY_TICK_S if st.session_state.get("replay_playing") else None
+                st.fragment(run_every=replay_every)(replay_player)(frames, freq_min)
+        else:
+            deck = get_map_deck(map_kind, filter_key, df_filtered, columnar=columnar_maps)
+            if deck:
+                st.pydeck_chart(deck)
+                if map_kind == "density":
+                    raster = get_kde_raster(filter_key, df_filtered)
+                    st.caption(
+                        f"Kernel density of {raster['n_calls']} calls "
+                        f"({raster['bandwidth_m']:.0f} m bandwidth); red ≈ {raster['vmax']:.1f} calls/km² or more."
+                    )
+            else:
+                st.info(empty_message)
 
-        with tab1:
-            deck_points = pydeck_points_map(df_filtered)
-            if deck_points:
-                st.pydeck_chart(deck_points)
+        # -------------------------
+        # Drill-down: filtered calls around a point or station (grid index over the whole dataset)
+        # -------------------------
+        with st.expander("Calls Near a Point", expanded=False):
+            spatial_index = get_spatial_index(dataset_key, df)
+            stations = get_stations()
+            centre_options = ["Custom point"] + ([] if stations is None else stations["station"].tolist())
+            drill_cols = st.columns(4)
+            drill_centre = drill_cols[0].selectbox("Centre", centre_options, key="drill_centre")
+            if drill_centre == "Custom point":
+                drill_lat = drill_cols[1].number_input("Latitude", value=float(df["caller_lat"].median()),
+                                                       format="%.5f", key="drill_lat")
+                drill_lon = drill_cols[2].number_input("Longitude", value=float(df["caller_lon"].median()),
+                                                       format="%.5f", key="drill_lon")
             else:
-                st.info("No valid coordinates to plot.")
+                station_row = stations[stations["station"] == drill_centre].iloc[0]
+                drill_lat, drill_lon = float(station_row["lat"]), float(station_row["lon"])
+                drill_cols[1].metric("Latitude", f"{drill_lat:.5f}")
+                drill_cols[2].metric("Longitude", f"{drill_lon:.5f}")
+            drill_radius = drill_cols[3].number_input("Radius (m)", min_value=50, value=500, step=50, key="drill_radius")
+
+            near_idx, near_dist = spatial_index.radius(drill_lat, drill_lon, drill_radius, mask=mask,
+                                                       return_distance=True)
+            near = df.iloc[near_idx].assign(distance_m=near_dist.round(0))
+            st.metric(f"Filtered calls within {drill_radius} m", len(near))
+            if not near.empty:
+                near_cols = st.columns([2, 1])
+                with near_cols[0]:
+                    near_deck = pydeck_points_map(near)
+                    if near_deck:
+                        st.pydeck_chart(near_deck)
+                with near_cols[1]:
+                    st.dataframe(near["category"].value_counts().rename_axis("category").reset_index(name="calls"),
+                                 hide_index=True)
+                    if "response_time_min" in near.columns:
+                        st.metric("Mean response (min)", f"{pd.to_numeric(near['response_time_min'], errors='coerce').mean():.1f}")
+            if stations is not None and not stations.empty:
+                st.markdown(f"**Filtered calls within {drill_radius} m of each station**")
+                station_counts = [len(spatial_index.radius(lat, lon, drill_radius, mask=mask))
+                                  for lat, lon in zip(stations["lat"], stations["lon"])]
+                st.dataframe(stations.assign(calls=station_counts).sort_values("calls", ascending=False),
+                             hide_index=True)
 
-        with tab2:
-            deck_heat = pydeck_heatmap(df_filtered)
-            if deck_heat:
-                st.pydeck_chart(deck_heat)
+        # -------------------------
+        # Police-station coverage (needs data/police_stations.csv)
+        # -------------------------
+        if os.path.exists(STATIONS_PATH) and not df_filtered.empty:
+            with st.expander("Police Station Coverage", expanded=False):
+                coverage = get_station_coverage(filter_key, df_filtered, os.path.getmtime(STATIONS_PATH))
+                far_calls = int((coverage["calls"]["station_distance_km"] > FAR_FROM_STATION_KM).sum())
+                st.metric(f"Calls > {FAR_FROM_STATION_KM:.0f} km from nearest station", far_calls)
+                st.markdown("**Response time by distance to nearest station**")
+                st.dataframe(coverage["profile"], hide_index=True)
+                st.markdown("**Largest coverage gaps**")
+                st.dataframe(coverage["gaps"].head(20), hide_index=True)
+
+        # -------------------------
+        # Festival event study (every occurrence in the dataset, all dates)
+        # -------------------------
+        if all_festivals:
+            with st.expander("Festival Event Study", expanded=False):
+                es_window = st.slider("Days before / after festival", 1, 7, 3, key="event_study_window")
+                study = get_event_study(dataset_key, df, festival_version, all_festivals, window=es_window)
+                if study["window"].empty:
+                    st.info("No festival occurrences fall within the dataset's dates.")
+                else:
+                    group_options = study["window"][["group_type", "group"]].drop_duplicates()
+                    group_labels = ["All calls"] + [f"{t}: {g}" for t, g in group_options.iloc[1:].itertuples(index=False)]
+                    es_group = st.selectbox("Calls", group_labels, key="event_study_group")
+                    es_type, es_name = ("all", "All") if es_group == "All calls" else es_group.split(": ", 1)
+
+                    summary = study["window"][(study["window"]["group_type"] == es_type) &
+                                              (study["window"]["group"] == es_name)]
+                    st.markdown("**Uplift over the day-of-week baseline (festival day ± 1)**")
+                    st.dataframe(summary.drop(columns=["group_type", "group"]).head(25), hide_index=True)
+
+                    es_festival = st.selectbox("Festival", summary["festival"].tolist(), key="event_study_festival")
+                    curve = study["by_day"][(study["by_day"]["festival"] == es_festival) &
+                                            (study["by_day"]["group_type"] == es_type) &
+                                            (study["by_day"]["group"] == es_name)]
+                    fig_es = go.Figure([
+                        go.Scatter(x=curve["rel_day"], y=curve["ci_high"], line=dict(width=0), showlegend=False),
+                        go.Scatter(x=curve["rel_day"], y=curve["ci_low"], line=dict(width=0), fill="tonexty",
+                                   fillcolor="rgba(31,119,180,0.2)", name="95% CI"),
+                        go.Scatter(x=curve["rel_day"], y=curve["uplift"], mode="lines+markers", name="Uplift"),
+                    ])
+                    fig_es.update_layout(xaxis_title="Days relative to festival", yaxis_title="Uplift",
+                                         yaxis_tickformat=".0%", height=320, margin=dict(t=20, b=20))
+                    st.plotly_chart(fig_es, use_container_width=True)
+
+        # -------------------------
+        # Resource allocation planner (forecast demand per jurisdiction x shift)
+        # -------------------------
+        with st.expander("Resource Allocation Planner", expanded=False):
+            st.caption("Units on duty per shift; recommendations follow forecast calls over the last 8 weeks.")
+            unit_cols = st.columns(len(RESOURCE_DEMAND_CATEGORIES))
+            units_by_resource = tuple(
+                (resource, int(col.number_input(resource.replace("_", " ").title(), min_value=0, value=0,
+                                                step=1, key=f"plan_units_{resource}")))
+                for col, resource in zip(unit_cols, RESOURCE_DEMAND_CATEGORIES)
+            )
+            min_units = st.number_input("Minimum units per jurisdiction", min_value=0, value=0, step=1,
+                                        key="plan_min_units")
+            units_by_resource = tuple((r, u) for r, u in units_by_resource if u > 0)
+            if not units_by_resource:
+                st.info("Enter the units available per shift to get a recommended allocation.")
             else:
-                st.info("No valid coordinates to plot heatmap.")
+                plan = get_week_plan(dataset_key, df, units_by_resource, min_units=int(min_units))
+                no_demand = resources_without_demand(df, [r for r, _ in units_by_resource])
+                if no_demand:
+                    st.caption("No calls in this dataset match " + ", ".join(no_demand) +
+                               "; allocate those by hand.")
+                planned = [r for r, _ in units_by_resource if r not in no_demand]
+                if planned:
+                    plan_resource = st.selectbox("Resource type", planned, key="plan_resource")
+                    plan_view = plan[plan["resource_type"] == plan_resource]
+                    st.dataframe(
+                        plan_view.pivot_table(index="jurisdiction", columns=["day", "shift"],
+                                              values="recommended_units", sort=False),
+                        use_container_width=True,
+                    )
+                    plan_date = st.date_input("Log recommendation for", value=pd.Timestamp.now().date() + pd.Timedelta(days=1),
+                                              key="plan_date")
+                    if st.button("Log allocations", key="plan_log"):
+                        user = st.session_state.user_data or {}
+                        plan_day = pd.Timestamp(plan_date).strftime("%a")
+                        rows = plan_view[(plan_view["day"] == plan_day) & (plan_view["recommended_units"] > 0)]
+                        add_allocations([
+                            {"officer": user.get("username", st.session_state.username), "rank": user.get("rank"),
+                             "jurisdiction": r.jurisdiction, "resource_type": r.resource_type,
+                             "quantity": r.recommended_units, "shift": r.shift, "shift_date": plan_date,
+                             "remarks": "Recommended by planner"}
+                            for r in rows.itertuples(index=False)
+                        ])
+                        st.success(f"Logged {len(rows)} allocations")
+
+            st.markdown("**Erlang-C minimum units**")
+            erlang_cols = st.columns(2)
+            wait_target = erlang_cols[0].slider("Max probability a call waits", 0.05, 0.5,
+                                                TARGET_WAIT_PROBABILITY, 0.05, key="erlang_target")
+            on_scene_min = erlang_cols[1].number_input("Minutes on scene per call", min_value=0, value=int(ON_SCENE_MIN),
+                                                       step=5, key="erlang_on_scene")
+            staffing = get_staffing(dataset_key, df, target=float(wait_target), on_scene_min=float(on_scene_min))
+            by_shift = staffing["by_shift"]
+            st.dataframe(
+                by_shift.pivot_table(index="jurisdiction", columns=["day", "shift"],
+                                     values="units_required", sort=False),
+                use_container_width=True,
+            )
+            statewide = (by_shift.groupby(["day", "shift"], sort=False)["units_required"].sum()
+                         .groupby(level="shift", sort=False).max())
+            st.caption("Peak units needed statewide per shift: " +
+                       ", ".join(f"{shift} {units}" for shift, units in statewide.items()))
 
-        with tab3:
-            deck_hex = pydeck_hexbin_map(df_filtered)
-            if deck_hex:
-                st.pydeck_chart(deck_hex)
+        # -------------------------
+        # Logged allocations vs the calls that came in
+        # -------------------------
+        allocation_version = allocation_log_version()
+        if allocation_version[1]:
+            with st.expander("Allocation vs Demand", expanded=False):
+                alloc_coverage = get_allocation_coverage(dataset_key, df, allocation_version)
+                if alloc_coverage.empty:
+                    st.info("No logged allocations name a known shift.")
+                else:
+                    st.markdown(f"**By jurisdiction** (SLA: response within {RESPONSE_SLA_MIN} min)")
+                    st.dataframe(coverage_by_jurisdiction(alloc_coverage), hide_index=True)
+                    st.markdown("**By shift**")
+                    st.dataframe(alloc_coverage.drop(columns=["shift_start", "shift_end"]), hide_index=True)
+                if st.button("Export allocation log to XLSX", key="alloc_export"):
+                    st.download_button("Download allocations.xlsx", export_allocations_xlsx(), file_name="allocations.xlsx",
+                                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                       key="alloc_download")
+
+        # -------------------------
+        # What-if response simulation
+        # -------------------------
+        with st.expander("Response What-If Simulator", expanded=False):
+            sim_model = get_response_model(dataset_key, df)
+            if not sim_model["jurisdictions"]:
+                st.info("No calls with a jurisdiction to simulate.")
             else:
-                st.info("No valid coordinates to plot hexbin hotspots.")
+                sim_cols = st.columns(4)
+                sim_jurisdiction = sim_cols[0].selectbox("Jurisdiction", sim_model["jurisdictions"], key="sim_jurisdiction")
+                sim_day = sim_cols[1].selectbox("Day", WEEKDAY_NAMES, index=5, key="sim_day")
+                sim_units = sim_cols[2].number_input("Units now", min_value=1, value=2, step=1, key="sim_units")
+                sim_extra = sim_cols[3].number_input("Extra units", min_value=0, value=2, step=1, key="sim_extra")
+                sim_festival = st.checkbox("Festival day", value=True, key="sim_festival")
+                with st.spinner("Simulating..."):
+                    sim_summary, sim_samples = get_scenario(
+                        dataset_key, sim_model, sim_jurisdiction, int(sim_units), int(sim_extra),
+                        day=WEEKDAY_NAMES.index(sim_day), festival=sim_festival,
+                        on_scene_min=float(on_scene_min),
+                    )
+                st.caption(f"{SIM_REPLICATIONS} simulated days; both scenarios see the same calls. "
+                           f"Units spend {on_scene_min} min on scene per call (set with the Erlang-C units above).")
+                st.dataframe(sim_summary, hide_index=True)
+                sim_fig = go.Figure()
+                for name, samples in sim_samples.items():
+                    sim_fig.add_trace(go.Histogram(x=samples, name=name, opacity=0.6, histnorm="probability"))
+                sim_fig.update_layout(barmode="overlay", xaxis_title="Response time (min)", yaxis_title="Share of calls",
+                                      height=300, margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(sim_fig, use_container_width=True)
 
         # -------------------------
         # Time series (highlight significant festivals with hover-over regions)
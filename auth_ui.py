@@ -2,6 +2,9 @@ import streamlit as st
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 import re
+from modules.user_data import get_firestore_client, get_user_profile, invalidate_user_profile
+from modules.alert_feed import get_alert_feed
+from modules.firebase_auth import forget_token
 
 # Updated Police ranks for signup
 POLICE_RANKS = [
@@ -21,6 +24,9 @@ POLICE_RANKS = [
 
 TOP_OFFICER_RANKS = POLICE_RANKS[:5]  # First 5 ranks
 
+# Seconds between refreshes of the alert list (served from the local listener cache)
+ALERT_REFRESH_S = 15
+
 def initialize_session_state():
     """Initialize session state variables for authentication"""
     if 'authentication_status' not in st.session_state:
@@ -114,7 +120,7 @@ def signup_form():
                 )
                 
                 # Store additional user data in Firestore
-                db = firestore.client()
+                db = get_firestore_client()
                 db.collection('users').document(username).set({
                     'first_name': first_name,
                     'last_name': last_name,
@@ -124,6 +130,7 @@ def signup_form():
                     'police_station': police_station,
                     'created_at': firestore.SERVER_TIMESTAMP
                 })
+                invalidate_user_profile(username)
                 
                 st.success("Account created successfully! Please log in.")
             except Exception as e:
@@ -140,14 +147,12 @@ def login_form():
 
         if submit:
             try:
-                db = firestore.client()
-                user_doc = db.collection('users').document(username).get()
+                user_data = get_user_profile(username)
                 
-                if not user_doc.exists:
+                if user_data is None:
                     st.error("Invalid username or password")
                     return
                 
-                user_data = user_doc.to_dict()
                 st.session_state.authentication_status = True
                 st.session_state.username = username
                 st.session_state.user_id = username
@@ -242,6 +247,7 @@ def show_user_info():
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("Yes, Logout", type="primary", key="confirm_logout_btn"):
+                        forget_token(st.session_state.user_id)
                         # Clear all session state
                         for key in list(st.session_state.keys()):
                             del st.session_state[key]
@@ -254,7 +260,7 @@ def show_user_info():
 
 def notification_center():
     """Notification center for top officers to send alerts and sub officers to view them."""
-    db = firestore.client()
+    db = get_firestore_client()
     user_data = st.session_state.user_data
     rank = user_data.get("rank", "")
 
@@ -286,35 +292,34 @@ def notification_center():
                 })
                 st.success("Alert sent to sub officers!")
 
-    # Sub officers see alerts - Modified query to work without complex index
+    # Sub officers see alerts from the process-wide listener cache
     else:
         st.subheader("Alerts from Top Officers")
-        try:
-            # Simple query without ordering first
-            alerts_ref = db.collection("alerts").where("active", "==", True).limit(10)
-            alerts = alerts_ref.stream()
-            
-            # Process results in memory
-            alert_list = []
-            for alert in alerts:
-                alert_data = alert.to_dict()
-                alert_data['id'] = alert.id
-                if 'timestamp' in alert_data:  # Check if timestamp exists
-                    alert_list.append(alert_data)
-            
-            # Sort in memory by timestamp if available
-            if alert_list:
-                try:
-                    alert_list.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-                except:
-                    # If sorting fails, just show the alerts as they are
-                    pass
-            
-            # Display alerts
-            if alert_list:
-                for alert_data in alert_list[:10]:
-                    with st.container():
-                        st.markdown(f"""
+        show_alerts()
+
+@st.fragment(run_every=ALERT_REFRESH_S)
+def show_alerts():
+    """Render cached alerts; reruns on a timer so new alerts appear without a page interaction."""
+    try:
+        feed = get_alert_feed()
+        _, alert_list = feed.snapshot()
+        if feed.error is not None:
+            st.warning(f"Alerts may be out of date: {feed.error}")
+        
+        # Let the officer know about alerts that arrived since they last looked
+        current_ids = {a["id"] for a in alert_list}
+        seen_ids = st.session_state.get("alerts_seen_ids")
+        if seen_ids is not None:
+            for alert_data in alert_list:
+                if alert_data["id"] not in seen_ids:
+                    st.toast(f"🚨 New alert: {alert_data.get('title', 'N/A')}")
+        st.session_state.alerts_seen_ids = current_ids
+        
+        # Display alerts
+        if alert_list:
+            for alert_data in alert_list[:10]:
+                with st.container():
+                    st.markdown(f"""
         **{alert_data.get('title', 'N/A')}**  
         {alert_data.get('message', 'N/A')}  
         👤 **Caller Name:** {alert_data.get('caller_name', 'N/A')}  
@@ -322,13 +327,13 @@ def notification_center():
         🚓 **Deployment Location:** {alert_data.get('location', 'N/A')}  
         👮 **Sent by:** {alert_data.get('from_rank', 'N/A')} ({alert_data.get('from_officer', 'N/A')})
         """)
-                        st.markdown("---")
-            else:
-                st.info("No active alerts at the moment.")
-                
-        except Exception as e:
-            st.error(f"Error loading alerts: {str(e)}")
-            st.info("Please try refreshing the page.")
+                    st.markdown("---")
+        else:
+            st.info("No active alerts at the moment.")
+            
+    except Exception as e:
+        st.error(f"Error loading alerts: {str(e)}")
+        st.info("Please try refreshing the page.")
 
 # Police station lists
 NORTH_DISTRICT_POLICE_STATIONS = [
@@ -12,4 +12,21 @@ REQUIRED_COLUMNS = [
 
 DATE_COL = "call_ts"
 CATEGORY_COL = "category"
-JURISDICTION_COL = "jurisdiction"
\ No newline at end of file
+JURISDICTION_COL = "jurisdiction"
+
+# Filtered row count above which the maps switch to columnar transport
+COLUMNAR_MAP_MIN_ROWS = 20000
+
+# Realistic Goa coordinates (approximate bounds)
+# Goa latitude: ~14.9-15.8, longitude: ~73.7-74.3
+GOA_BOUNDS = {
+    'lat_min': 14.5, 'lat_max': 16.0,
+    'lon_min': 73.0, 'lon_max': 75.0
+}
+
+# Duty shifts as (start hour, end hour); a shift may wrap past midnight
+SHIFT_WINDOWS = {
+    "Morning": (6, 14),
+    "Evening": (14, 22),
+    "Night": (22, 6),
+}
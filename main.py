@@ -1,6 +1,7 @@
 # main.py
 import streamlit as st
 from modules.firebase_auth import FirebaseAuth
+from modules.activity_log import log_activity
 import app  # your dashboard code
 
 # Initialize Firebase Auth
@@ -75,7 +76,7 @@ if not st.session_state.logged_in:
                                 st.session_state.user = user_data
                                 
                                 # Log activity
-                                firebase_auth.log_activity(
+                                log_activity(
                                     user_data['id'],
                                     'login',
                                     {'method': 'email'}
@@ -207,7 +208,7 @@ if not st.session_state.logged_in:
                                 
                                 # Log registration activity
                                 if user_data:
-                                    firebase_auth.log_activity(
+                                    log_activity(
                                         user_data['id'],
                                         'registration',
                                         {'method': 'email'}
@@ -279,7 +280,7 @@ else:
     # Logout button
     if st.sidebar.button("🚪 Logout", use_container_width=True):
         # Log activity before logout
-        firebase_auth.log_activity(
+        log_activity(
             st.session_state.user['id'],
             'logout',
             None
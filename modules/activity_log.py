@@ -0,0 +1,209 @@
+# modules/activity_log.py
+# Background activity-log writer: bounded queue, Firestore batch writes, local append log when offline.
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+from modules.user_data import get_firestore_client
+
+ACTIVITY_COLLECTION = "activity_logs"
+# Events go here when Firestore is unreachable (or the queue is full) and are replayed later
+ACTIVITY_SPOOL_FILE = "data/activity_log.jsonl"
+ACTIVITY_QUEUE_SIZE = 10_000
+# Firestore allows up to 500 writes per batch
+ACTIVITY_BATCH_SIZE = 200
+ACTIVITY_FLUSH_INTERVAL_S = 5
+# While idle, a failed spool replay is retried after this long, doubling up to the cap
+ACTIVITY_REPLAY_BACKOFF_S = 30
+ACTIVITY_REPLAY_BACKOFF_MAX_S = 15 * 60
+
+
+def _append_lines(path, lines):
+    """Append to a JSONL file, first ending a line a crash may have left unterminated."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        f.write("".join(lines).encode("utf-8"))
+
+
+class ActivityLogger:
+    """
+    log() only enqueues; a daemon thread drains the queue every
+    `flush_interval` seconds (or as soon as a batch fills) and commits one
+    Firestore batch per `batch_size` events. Failed batches and overflow are
+    appended to a local JSONL spool, which is replayed after the next
+    successful commit (or, with nothing new to send, on a backoff). Spool
+    lines that cannot be parsed are moved to `<spool>.bad`. close() flushes
+    what is left.
+    """
+
+    def __init__(self, client_factory=get_firestore_client, collection=ACTIVITY_COLLECTION,
+                 spool_path=ACTIVITY_SPOOL_FILE, maxsize=ACTIVITY_QUEUE_SIZE,
+                 batch_size=ACTIVITY_BATCH_SIZE, flush_interval=ACTIVITY_FLUSH_INTERVAL_S):
+        self.client_factory = client_factory
+        self.collection = collection
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._spool_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._stop = threading.Event()
+        # Set by log() once a full batch is waiting, so the writer does not sit out the interval
+        self._flush_event = threading.Event()
+        self._replay_after = 0.0
+        self._replay_backoff = ACTIVITY_REPLAY_BACKOFF_S
+        self._thread = threading.Thread(target=self._run, name="activity-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, user_id, action, details=None):
+        """Queue an event and return immediately."""
+        event = {"user_id": user_id, "action": action, "details": details, "timestamp": datetime.now()}
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spool([event])
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_event.set()
+
+    def _drain(self):
+        events = []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the writer alive; whatever was not sent is still queued or spooled
+                print("Activity log flush failed:", e)
+
+    def flush(self):
+        """Write everything queued so far; returns the number of events committed to Firestore."""
+        written = 0
+        while True:
+            events = self._drain()
+            if not events:
+                break
+            if not self._commit(events):
+                self._spool(events)
+                return written
+            written += len(events)
+        spooled = os.path.exists(self.spool_path) or os.path.exists(self.spool_path + ".sending")
+        if spooled and (written or time.monotonic() >= self._replay_after):
+            written += self._replay_spool()
+        return written
+
+    def _commit(self, events):
+        try:
+            db = self.client_factory()
+            batch = db.batch()
+            for event in events:
+                batch.set(db.collection(self.collection).document(), event)
+            batch.commit()
+            return True
+        except Exception as e:
+            print("Activity log write failed, spooling locally:", e)
+            return False
+
+    def _spool(self, events):
+        with self._spool_lock:
+            _append_lines(self.spool_path, [json.dumps(dict(event, timestamp=event["timestamp"].isoformat()), default=str)
+                                            + "\n" for event in events])
+
+    def _replay_spool(self):
+        """
+        Upload spooled events once Firestore is reachable again. The spool is
+        moved aside to `.sending` first; if a previous replay left one behind,
+        the spool is appended to it so neither is lost.
+        """
+        if not self._replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._replay_spool_locked()
+        finally:
+            self._replay_lock.release()
+
+    def _replay_spool_locked(self):
+        sending = self.spool_path + ".sending"
+        with self._spool_lock:
+            if os.path.exists(self.spool_path):
+                if os.path.exists(sending):
+                    with open(self.spool_path, encoding="utf-8") as src:
+                        _append_lines(sending, src.readlines())
+                    os.remove(self.spool_path)
+                else:
+                    os.replace(self.spool_path, sending)
+            elif not os.path.exists(sending):
+                return 0
+        events, lines, bad = [], [], []
+        with open(sending, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                    event["timestamp"] = datetime.fromisoformat(event["timestamp"])
+                except (ValueError, TypeError, KeyError):
+                    # e.g. a line cut short by a crash mid-write
+                    bad.append(line if line.endswith("\n") else line + "\n")
+                    continue
+                events.append(event)
+                lines.append(line if line.endswith("\n") else line + "\n")
+        if bad:
+            _append_lines(self.spool_path + ".bad", bad)
+            print(f"Activity log: moved {len(bad)} unreadable spool lines to {self.spool_path}.bad")
+
+        written = 0
+        for i in range(0, len(events), self.batch_size):
+            if not self._commit(events[i:i + self.batch_size]):
+                # Keep only what is still unsent and wait before trying again
+                tmp = sending + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(lines[i:])
+                os.replace(tmp, sending)
+                self._replay_after = time.monotonic() + self._replay_backoff
+                self._replay_backoff = min(self._replay_backoff * 2, ACTIVITY_REPLAY_BACKOFF_MAX_S)
+                return written
+            written += len(events[i:i + self.batch_size])
+        os.remove(sending)
+        self._replay_after = 0.0
+        self._replay_backoff = ACTIVITY_REPLAY_BACKOFF_S
+        return written
+
+    def close(self):
+        """Stop the writer thread and flush what is queued."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._flush_event.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+@st.cache_resource(show_spinner=False)
+def get_activity_logger():
+    """One writer thread per process."""
+    return ActivityLogger()
+
+
+def log_activity(user_id, action, details=None):
+    """Record a user action without blocking the caller."""
+    get_activity_logger().log(user_id, action, details)
@@ -0,0 +1,73 @@
+# modules/alert_feed.py
+# Process-wide cache of active alerts, kept current by a Firestore snapshot listener.
+import threading
+
+import streamlit as st
+from modules.user_data import get_firestore_client
+
+ALERT_LIMIT = 10
+# Seconds the first render waits for the listener's initial snapshot
+FIRST_SNAPSHOT_TIMEOUT_S = 5
+
+
+class AlertFeed:
+    """
+    Active alerts held in memory. The Firestore listener thread replaces the
+    list on every snapshot and bumps `version`; readers only take a lock, so
+    rendering the notification centre never touches the network. If the
+    listener stops (stream error, closed by the server), the next reader
+    subscribes again.
+    """
+
+    def __init__(self, client, limit=ALERT_LIMIT):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._alerts = []
+        self.version = 0
+        self.error = None
+        self._query = client.collection("alerts").where("active", "==", True).limit(limit)
+        self._watch = self._query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        try:
+            alerts = []
+            for doc in docs:
+                data = doc.to_dict()
+                data["id"] = doc.id
+                if data.get("timestamp") is not None:
+                    alerts.append(data)
+            alerts.sort(key=lambda a: a["timestamp"], reverse=True)
+            with self._lock:
+                self._alerts = alerts
+                self.version += 1
+                self.error = None
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    def _ensure_listening(self):
+        """Re-subscribe if the listener has closed."""
+        if getattr(self._watch, "is_active", True):
+            return
+        with self._lock:
+            if getattr(self._watch, "is_active", True):
+                return
+            self.error = RuntimeError("Alert listener closed; reconnecting")
+            self._watch = self._query.on_snapshot(self._on_snapshot)
+
+    def snapshot(self, timeout=FIRST_SNAPSHOT_TIMEOUT_S):
+        """(version, alerts newest first); waits for the first snapshot up to `timeout` seconds."""
+        self._ensure_listening()
+        self._ready.wait(timeout)
+        with self._lock:
+            return self.version, [dict(a) for a in self._alerts]
+
+    def close(self):
+        self._watch.unsubscribe()
+
+
+@st.cache_resource(show_spinner=False)
+def get_alert_feed():
+    """One listener per process, shared by every session."""
+    return AlertFeed(get_firestore_client())
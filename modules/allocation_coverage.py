@@ -0,0 +1,105 @@
+# modules/allocation_coverage.py
+# Logged allocations vs the calls that came in during each shift.
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import SHIFT_WINDOWS
+from modules.allocations import load_allocations
+from modules.shifts import assign_shifts
+
+# Response time (minutes) above which a call breaches the SLA
+RESPONSE_SLA_MIN = 15
+
+COVERAGE_COLUMNS = ["jurisdiction", "shift_date", "shift", "shift_start", "shift_end", "units",
+                    "calls", "responded", "calls_per_unit", "mean_response_min", "sla_breaches", "sla_breach_rate"]
+
+
+def allocated_shifts(allocations, shifts=SHIFT_WINDOWS):
+    """
+    Units per jurisdiction and shift window. An allocation covers `shift` on
+    its shift_date. Without one, the date is the day the shift started when it
+    was logged: a night shift logged after midnight belongs to the previous day.
+    Rows naming an unknown shift are skipped.
+    """
+    alloc = allocations.copy()
+    alloc = alloc[alloc["shift"].isin(list(shifts))]
+    logged = pd.to_datetime(alloc["timestamp"], errors="coerce")
+    start_h = alloc["shift"].map({k: v[0] for k, v in shifts.items()})
+    end_h = alloc["shift"].map({k: v[1] for k, v in shifts.items()})
+    after_midnight = (end_h <= start_h) & (logged.dt.hour < end_h)
+    logged_shift_date = logged.dt.normalize() - pd.to_timedelta(after_midnight.astype(int), unit="D")
+    shift_date = pd.to_datetime(alloc["shift_date"], errors="coerce")
+    shift_date = shift_date.fillna(logged_shift_date).dt.normalize()
+    alloc = alloc.assign(shift_date=shift_date,
+                         units=pd.to_numeric(alloc["quantity"], errors="coerce").fillna(0))
+    alloc = alloc.dropna(subset=["shift_date", "jurisdiction"])
+
+    grouped = (alloc.groupby(["jurisdiction", "shift_date", "shift"], sort=True)["units"].sum()
+               .reset_index())
+    start_h = grouped["shift"].map({k: v[0] for k, v in shifts.items()})
+    end_h = grouped["shift"].map({k: v[1] for k, v in shifts.items()})
+    grouped["shift_start"] = grouped["shift_date"] + pd.to_timedelta(start_h, unit="h")
+    grouped["shift_end"] = (grouped["shift_date"] + pd.to_timedelta(end_h, unit="h") +
+                            pd.to_timedelta((end_h <= start_h).astype(int), unit="D"))
+    return grouped
+
+
+def calls_per_shift(df, shifts=SHIFT_WINDOWS, sla_min=RESPONSE_SLA_MIN,
+                    ts_col="call_ts", jurisdiction_col="jurisdiction"):
+    """
+    Calls, mean response and SLA breaches per jurisdiction and shift window.
+    Shift windows tile the day, so the interval join is a single vectorised
+    bucketing of call timestamps on the shift boundaries.
+    """
+    code, shift_date = assign_shifts(df[ts_col], shifts)
+    response = (pd.to_numeric(df["response_time_min"], errors="coerce").to_numpy()
+                if "response_time_min" in df.columns else np.full(len(df), np.nan))
+    calls = pd.DataFrame({
+        "jurisdiction": df[jurisdiction_col].to_numpy(),
+        "shift_date": shift_date,
+        "shift": np.asarray(list(shifts) + [None], dtype=object)[code],
+        "response": response,
+        "breach": response > sla_min,
+    })
+    calls = calls[code >= 0]
+    return (calls.groupby(["jurisdiction", "shift_date", "shift"], sort=False)
+            .agg(calls=("response", "size"), mean_response_min=("response", "mean"),
+                 sla_breaches=("breach", "sum"), responded=("response", "count"))
+            .reset_index())
+
+
+def allocation_coverage(df, allocations, shifts=SHIFT_WINDOWS, sla_min=RESPONSE_SLA_MIN):
+    """One row per allocated jurisdiction x shift with calls-per-unit and SLA breach rate."""
+    windows = allocated_shifts(allocations, shifts)
+    if windows.empty:
+        return pd.DataFrame(columns=COVERAGE_COLUMNS)
+
+    demand = calls_per_shift(df, shifts, sla_min)
+    demand["jurisdiction"] = demand["jurisdiction"].astype(str)
+    windows["jurisdiction"] = windows["jurisdiction"].astype(str)
+    out = windows.merge(demand, on=["jurisdiction", "shift_date", "shift"], how="left")
+    out[["calls", "sla_breaches", "responded"]] = out[["calls", "sla_breaches", "responded"]].fillna(0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["calls_per_unit"] = np.where(out["units"] > 0, out["calls"] / out["units"], np.nan)
+        out["sla_breach_rate"] = np.where(out["responded"] > 0, out["sla_breaches"] / out["responded"], np.nan)
+    out[["calls", "responded", "sla_breaches"]] = out[["calls", "responded", "sla_breaches"]].astype(int)
+    return out[COVERAGE_COLUMNS].sort_values(["shift_start", "jurisdiction"], ignore_index=True)
+
+
+def coverage_by_jurisdiction(coverage):
+    """Totals per jurisdiction across the allocated shifts."""
+    totals = (coverage.groupby("jurisdiction")
+              .agg(shifts=("shift", "size"), units=("units", "sum"), calls=("calls", "sum"),
+                   responded=("responded", "sum"), sla_breaches=("sla_breaches", "sum"))
+              .reset_index())
+    with np.errstate(invalid="ignore", divide="ignore"):
+        totals["calls_per_unit"] = totals["calls"] / totals["units"].where(totals["units"] > 0)
+        totals["sla_breach_rate"] = totals["sla_breaches"] / totals["responded"].where(totals["responded"] > 0)
+    return totals.sort_values("sla_breach_rate", ascending=False, ignore_index=True)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_allocation_coverage(dataset_key, _df, allocation_version):
+    """Coverage per dataset and allocation-log version (see allocations.allocation_log_version)."""
+    return allocation_coverage(_df, load_allocations())
@@ -0,0 +1,143 @@
+# modules/allocation_optimizer.py
+# Recommend resource allocations per jurisdiction x shift from forecast call demand.
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import SHIFT_WINDOWS
+from modules.shifts import assign_shifts, WEEKDAY_NAMES
+
+# Weeks of history the demand forecast averages over
+FORECAST_HISTORY_WEEKS = 8
+
+# Call categories each resource type responds to (None = all calls)
+RESOURCE_DEMAND_CATEGORIES = {
+    "patrol_vehicle": None,
+    "ambulance": ["medical", "accident"],
+    "fire_tender": ["fire"],
+    "women_safety_unit": ["women_safety"],
+}
+
+
+def resources_without_demand(df, resource_types):
+    """Resource types none of whose call categories occur in df (nothing to weight them by)."""
+    present = set(df["category"].dropna().astype(str).str.lower())
+    return [r for r in resource_types
+            if RESOURCE_DEMAND_CATEGORIES.get(r) is not None
+            and not present & {c.lower() for c in RESOURCE_DEMAND_CATEGORIES[r]}]
+
+
+def forecast_shift_demand(df, categories=None, history_weeks=FORECAST_HISTORY_WEEKS,
+                          shifts=SHIFT_WINDOWS, ts_col="call_ts", jurisdiction_col="jurisdiction"):
+    """
+    Expected calls per jurisdiction for each weekday x shift slot of a week:
+    calls in that slot over the last `history_weeks` weeks divided by the
+    number of times the slot occurred in that period.
+
+    Returns (jurisdictions, slots DataFrame with day / shift, demand J x S array).
+    """
+    slots = pd.DataFrame([(d, s) for d in range(7) for s in shifts], columns=["day", "shift"])
+    if categories is not None:
+        df = df[df["category"].str.lower().isin([c.lower() for c in categories])]
+
+    code, shift_date = assign_shifts(df[ts_col], shifts)
+    keep = code >= 0
+    jurisdiction = df[jurisdiction_col].to_numpy()[keep]
+    code, shift_date = code[keep], pd.DatetimeIndex(shift_date[keep])
+
+    jurisdictions = sorted(pd.unique(pd.Series(jurisdiction).dropna()).astype(str).tolist())
+    demand = np.zeros((len(jurisdictions), len(slots)))
+    if len(code) == 0:
+        return jurisdictions, slots, demand
+
+    last = shift_date.max()
+    first = max(shift_date.min(), last - pd.Timedelta(weeks=history_weeks) + pd.Timedelta(days=1))
+    recent = np.asarray(shift_date >= first) & pd.notna(jurisdiction)
+    j_codes = pd.Categorical(jurisdiction[recent].astype(str), categories=jurisdictions).codes.astype(np.int64)
+    slot = shift_date[recent].dayofweek.to_numpy() * len(shifts) + code[recent]
+
+    counts = np.bincount(j_codes * len(slots) + slot, minlength=len(jurisdictions) * len(slots))
+    # How many times each weekday occurs in the history window
+    occurrences = np.bincount(pd.date_range(first, last, freq="D").dayofweek, minlength=7)
+    per_slot = np.repeat(np.maximum(occurrences, 1), len(shifts))
+    demand = counts.reshape(len(jurisdictions), len(slots)) / per_slot
+    return jurisdictions, slots, demand
+
+
+def apportion_units(demand, units, min_units=0, iterations=60):
+    """
+    Split `units[s]` whole units across the rows of column s of `demand` (J x S)
+    by the highest-averages (D'Hondt) rule: every row first gets `min_units`
+    (as far as the column's units allow), then each further unit goes to the row
+    with the largest demand / (units + 1). Solved for all columns at once by
+    bisecting the divisor, so a statewide week is a handful of array passes.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    n_rows, n_cols = demand.shape
+    units = np.broadcast_to(np.asarray(units, dtype=np.int64), (n_cols,))
+    if n_rows == 0:
+        return np.zeros((0, n_cols), dtype=np.int64)
+
+    base = np.minimum(min_units, units // n_rows)[None, :].repeat(n_rows, axis=0)
+    remaining = units - base.sum(axis=0)
+    # A tiny tie-breaker spreads units evenly where demand is flat or zero
+    d = demand + 1e-9
+
+    def extra(lam):
+        return np.maximum(np.floor(d / lam) - base, 0).sum(axis=0)
+
+    lo = np.full(n_cols, 1e-12)
+    hi = d.max(axis=0) / (base.min(axis=0) + 1) + 1.0
+    for _ in range(iterations):
+        mid = np.sqrt(lo * hi)
+        too_many = extra(mid) > remaining
+        lo = np.where(too_many, mid, lo)
+        hi = np.where(too_many, hi, mid)
+
+    alloc = np.maximum(base, np.floor(d / hi).astype(np.int64))
+    # Hand out what the divisor left over to the highest next priorities
+    short = remaining - (alloc - base).sum(axis=0)
+    rank = np.argsort(np.argsort(-(d / (alloc + 1)), axis=0, kind="stable"), axis=0)
+    alloc += rank < short[None, :]
+    return alloc
+
+
+def plan_week(df, units_by_resource, min_units=0, history_weeks=FORECAST_HISTORY_WEEKS,
+              shifts=SHIFT_WINDOWS):
+    """
+    Recommended allocation for every resource type, jurisdiction, weekday and
+    shift, given units on duty per shift for each resource type. Resource
+    types whose call categories never occur in df are left out: with no demand
+    the apportionment would only split their units evenly.
+    """
+    frames = []
+    skip = set(resources_without_demand(df, units_by_resource))
+    for resource_type, units in units_by_resource.items():
+        if resource_type in skip:
+            continue
+        categories = RESOURCE_DEMAND_CATEGORIES.get(resource_type)
+        jurisdictions, slots, demand = forecast_shift_demand(
+            df, categories=categories, history_weeks=history_weeks, shifts=shifts
+        )
+        alloc = apportion_units(demand, units, min_units=min_units)
+        n_j, n_s = demand.shape
+        with np.errstate(invalid="ignore", divide="ignore"):
+            per_unit = np.where(alloc > 0, demand / alloc, np.nan)
+        frames.append(pd.DataFrame({
+            "resource_type": resource_type,
+            "jurisdiction": np.repeat(jurisdictions, n_s),
+            "day": np.tile(np.asarray(WEEKDAY_NAMES)[slots["day"].to_numpy()], n_j),
+            "shift": np.tile(slots["shift"].to_numpy(), n_j),
+            "forecast_calls": demand.ravel().round(2),
+            "recommended_units": alloc.ravel(),
+            "calls_per_unit": per_unit.ravel().round(2),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["resource_type", "jurisdiction", "day", "shift",
+                                     "forecast_calls", "recommended_units", "calls_per_unit"])
+    return pd.concat(frames, ignore_index=True)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_week_plan(dataset_key, _df, units_by_resource, min_units=0):
+    """plan_week cached per dataset and resource inputs (units_by_resource as a tuple of pairs)."""
+    return plan_week(_df, dict(units_by_resource), min_units=min_units)
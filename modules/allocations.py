@@ -1,34 +1,181 @@
-def main():
-    import pandas as pd
-    from datetime import datetime
-    import os
-
-    ALLOC_FILE = "data/allocations.xlsx"
-
-    def initialize_allocations():
-        if not os.path.exists(ALLOC_FILE):
-            df = pd.DataFrame(columns=[
-                "timestamp", "officer", "rank", "jurisdiction", 
-                "resource_type", "quantity", "shift", "remarks"
-            ])
-            df.to_excel(ALLOC_FILE, index=False)
-
-    def load_allocations():
-        return pd.read_excel(ALLOC_FILE)
-
-    def add_allocation(officer, rank, jurisdiction, resource_type, quantity, shift, remarks=""):
-        df = load_allocations()
-        new_entry = {
-            "timestamp": datetime.now(),
-            "officer": officer,
-            "rank": rank,
-            "jurisdiction": jurisdiction,
-            "resource_type": resource_type,
-            "quantity": quantity,
-            "shift": shift,
-            "remarks": remarks
-        }
-        df = pd.concat([df, pd.DataFrame([new_entry])], ignore_index=True)
-        df.to_excel(ALLOC_FILE, index=False)
-        return new_entry
-    pass
\ No newline at end of file
+# modules/allocations.py
+# Resource allocation log: append-only SQLite (WAL) store, XLSX as an export.
+import io
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+ALLOC_DB = "data/allocations.db"
+# Export target (and the legacy system of record, imported once on first use)
+ALLOC_FILE = "data/allocations.xlsx"
+
+ALLOC_COLUMNS = [
+    "timestamp", "officer", "rank", "jurisdiction",
+    "resource_type", "quantity", "shift", "remarks", "shift_date"
+]
+
+# Fold the WAL back into the database once it grows past this
+COMPACT_WAL_BYTES = 4 * 1024 * 1024
+# Seconds a writer waits for another writer's lock before failing
+LOCK_TIMEOUT_S = 10
+
+# Store paths already created / migrated in this process
+_initialized = set()
+
+
+def _connect(path=ALLOC_DB):
+    """Autocommit connection (transactions are explicit) with WAL journaling."""
+    conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT_S, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def initialize_allocations(path=ALLOC_DB, legacy_xlsx=ALLOC_FILE):
+    """Create the allocation log; rows from a legacy allocations.xlsx are imported once."""
+    if path in _initialized and os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = _connect(path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS allocations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                officer TEXT,
+                rank TEXT,
+                jurisdiction TEXT,
+                resource_type TEXT,
+                quantity INTEGER,
+                shift TEXT,
+                remarks TEXT,
+                shift_date TEXT
+            )
+        """)
+        # Logs created before shift_date existed
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(allocations)")}
+        if "shift_date" not in columns:
+            conn.execute("ALTER TABLE allocations ADD COLUMN shift_date TEXT")
+        conn.execute("BEGIN IMMEDIATE")
+        empty = conn.execute("SELECT 1 FROM allocations LIMIT 1").fetchone() is None
+        if empty and legacy_xlsx and os.path.exists(legacy_xlsx):
+            legacy = pd.read_excel(legacy_xlsx)
+            if not legacy.empty:
+                _insert(conn, legacy.reindex(columns=ALLOC_COLUMNS).to_dict("records"))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    _initialized.add(path)
+
+
+def _row(entry):
+    timestamp = entry.get("timestamp") or datetime.now()
+    if not isinstance(timestamp, str):
+        timestamp = pd.Timestamp(timestamp).isoformat()
+    quantity = entry.get("quantity")
+    shift_date = entry.get("shift_date")
+    return (
+        timestamp, entry.get("officer"), entry.get("rank"), entry.get("jurisdiction"),
+        entry.get("resource_type"), None if pd.isna(quantity) else int(quantity),
+        entry.get("shift"), entry.get("remarks") or "",
+        None if shift_date is None or pd.isna(shift_date) else pd.Timestamp(shift_date).date().isoformat(),
+    )
+
+
+def _insert(conn, entries):
+    conn.executemany(
+        "INSERT INTO allocations (timestamp, officer, rank, jurisdiction, resource_type, quantity, shift, remarks, "
+        "shift_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [_row(e) for e in entries],
+    )
+
+
+def add_allocations(entries, path=ALLOC_DB):
+    """
+    Append a batch of allocations (dicts with ALLOC_COLUMNS keys) in one
+    transaction. Concurrent writers queue on SQLite's write lock.
+    """
+    entries = [dict(e, timestamp=e.get("timestamp") or datetime.now()) for e in entries]
+    if not entries:
+        return entries
+    initialize_allocations(path)
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _insert(conn, entries)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    _maybe_compact(path)
+    return entries
+
+
+def add_allocation(officer, rank, jurisdiction, resource_type, quantity, shift, remarks="",
+                   shift_date=None, path=ALLOC_DB):
+    new_entry = {
+        "timestamp": datetime.now(),
+        "officer": officer,
+        "rank": rank,
+        "jurisdiction": jurisdiction,
+        "resource_type": resource_type,
+        "quantity": quantity,
+        "shift": shift,
+        "remarks": remarks,
+        "shift_date": shift_date
+    }
+    return add_allocations([new_entry], path=path)[0]
+
+
+def load_allocations(path=ALLOC_DB):
+    """All allocations in insertion order, timestamps and shift dates parsed."""
+    initialize_allocations(path)
+    conn = _connect(path)
+    try:
+        df = pd.read_sql_query(f"SELECT {', '.join(ALLOC_COLUMNS)} FROM allocations ORDER BY id", conn)
+    finally:
+        conn.close()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", format="ISO8601")
+    df["shift_date"] = pd.to_datetime(df["shift_date"], errors="coerce")
+    return df
+
+
+def allocation_log_version(path=ALLOC_DB):
+    """
+    (last row id, row count) - changes whenever allocations are added. Creates
+    the store on first use, so legacy xlsx rows are imported before anything is shown.
+    """
+    initialize_allocations(path)
+    conn = _connect(path)
+    try:
+        last_id, count = conn.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM allocations").fetchone()
+    except sqlite3.OperationalError:
+        return (0, 0)
+    finally:
+        conn.close()
+    return (last_id, count)
+
+
+def export_allocations_xlsx(path=ALLOC_DB):
+    """The allocation log as Excel workbook bytes, built in memory for a download."""
+    buffer = io.BytesIO()
+    load_allocations(path).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def compact_allocations(path=ALLOC_DB, vacuum=False):
+    """Checkpoint the WAL into the database (and optionally VACUUM it)."""
+    conn = _connect(path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def _maybe_compact(path=ALLOC_DB):
+    wal = path + "-wal"
+    if os.path.exists(wal) and os.path.getsize(wal) > COMPACT_WAL_BYTES:
+        compact_allocations(path)
@@ -0,0 +1,67 @@
+# modules/animation.py
+# Precomputed time-of-day frames for replaying how hotspots move.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Grid used to aggregate calls inside a frame (~1.1 km)
+FRAME_CELL_DEG = 0.01
+FRAME_MINUTES_OPTIONS = [60, 30, 15]
+
+
+def build_time_frames(df, freq_min=60, cell_deg=FRAME_CELL_DEG,
+                      ts_col="call_ts", lat_col="caller_lat", lon_col="caller_lon"):
+    """
+    Bin calls by time-of-day slot (`freq_min` minutes) and grid cell in one pass.
+
+    Returns a dict of flat arrays sorted by frame: cell centre `lon` / `lat`,
+    `count`, and `offsets` so frame i is rows offsets[i]:offsets[i + 1].
+    `max_count` is shared by all frames to keep their scales comparable.
+    """
+    n_frames = (24 * 60) // freq_min
+    ts = pd.to_datetime(df[ts_col], errors="coerce")
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    minutes = (ts.dt.hour * 60 + ts.dt.minute).to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(minutes))
+
+    slot = (minutes[valid] // freq_min).astype(np.int64)
+    ix = np.floor(lon[valid] / cell_deg).astype(np.int64)
+    iy = np.floor(lat[valid] / cell_deg).astype(np.int64)
+
+    # One grouped pass over (slot, cell)
+    grouped = (pd.DataFrame({"slot": slot, "ix": ix, "iy": iy})
+               .groupby(["slot", "ix", "iy"], sort=True).size()
+               .reset_index(name="count"))
+
+    slots = grouped["slot"].to_numpy(dtype=np.int64)
+    return {
+        "freq_min": freq_min,
+        "n_frames": n_frames,
+        "lon": ((grouped["ix"].to_numpy() + 0.5) * cell_deg).astype(np.float32),
+        "lat": ((grouped["iy"].to_numpy() + 0.5) * cell_deg).astype(np.float32),
+        "count": grouped["count"].to_numpy(dtype=np.int32),
+        "offsets": np.searchsorted(slots, np.arange(n_frames + 1), side="left"),
+        "max_count": int(grouped["count"].max()) if len(grouped) else 0,
+        "frame_totals": np.bincount(slot, minlength=n_frames),
+        "cell_deg": cell_deg,
+    }
+
+
+def frame_label(frames, index):
+    """'HH:MM–HH:MM' label of a frame."""
+    start = index * frames["freq_min"]
+    end = start + frames["freq_min"]
+    return f"{start // 60:02d}:{start % 60:02d}–{(end // 60) % 24:02d}:{end % 60:02d}"
+
+
+def frame_cells(frames, index):
+    """(lon, lat, count) arrays for one frame - a slice, no recomputation."""
+    s, e = frames["offsets"][index], frames["offsets"][index + 1]
+    return frames["lon"][s:e], frames["lat"][s:e], frames["count"][s:e]
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_time_frames(filter_key, _df, freq_min=60):
+    """Frames for the filtered calls, computed once per filter fingerprint and frame size."""
+    return build_time_frames(_df, freq_min=freq_min)
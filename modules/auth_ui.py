@@ -1,6 +1,7 @@
 import streamlit as st
-from firebase_auth import goa_police_auth
-from user_data import store_police_officer_data, get_police_officer_data, update_last_login, check_username_availability
+import requests
+from modules.firebase_auth import get_goa_police_auth, forget_token
+from modules.user_data import store_police_officer_data, get_police_officer_data, update_last_login, check_username_availability
 
 # Define police ranks
 POLICE_RANKS = [
@@ -89,7 +90,7 @@ def signup_form():
             
             # Create account
             with st.spinner("Creating your police officer account..."):
-                result = goa_police_auth.sign_up(
+                result = get_goa_police_auth().sign_up(
                     first_name=first_name,
                     last_name=last_name, 
                     rank=rank,
@@ -158,7 +159,7 @@ def login_form():
                 return
                 
             with st.spinner("Authenticating police officer..."):
-                result = goa_police_auth.sign_in_with_name(first_name, last_name, rank, password)
+                result = get_goa_police_auth().sign_in_with_name(first_name, last_name, rank, password)
             
             if result["success"]:
                 user_data = result["user"]
@@ -185,6 +186,7 @@ def login_form():
 
 def logout():
     """Logout officer and clear session state"""
+    forget_token(st.session_state.user_id)
     st.session_state.authentication_status = None
     st.session_state.officer_data = None
     st.session_state.user_id = None
@@ -196,6 +198,21 @@ def show_officer_info():
     if st.session_state.authentication_status:
         user_id = st.session_state.user_id
         
+        # Cached ID token (refreshed near expiry); the officer signs in again only
+        # if the refresh token has been rejected
+        try:
+            token = get_goa_police_auth().get_id_token(
+                user_id, refresh_token=(st.session_state.officer_data or {}).get("refreshToken"))
+        except requests.RequestException as e:
+            token = ""
+            st.sidebar.caption(f"⚠️ Could not reach the sign-in service to renew your session: {e}")
+        if token is None:
+            st.session_state.authentication_status = None
+            st.session_state.officer_data = None
+            st.session_state.user_id = None
+            st.warning("Your session has expired. Please log in again.")
+            return
+        
         # Get officer data from Firestore
         officer_info = get_police_officer_data(user_id)
         
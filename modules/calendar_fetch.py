@@ -0,0 +1,156 @@
+# modules/calendar_fetch.py
+# Concurrent, conditional (ETag / If-Modified-Since) fetching of calendar feeds.
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+FETCH_STATE_PATH = os.path.join("data", "calendar_fetch_state.json")
+FETCH_CACHE_DIR = os.path.join("data", "calendar_cache")
+
+# (connect, read) seconds - a hung source costs at most this, once, in parallel
+FETCH_TIMEOUT = (5, 15)
+FETCH_MAX_WORKERS = 4
+
+# After a failure a source is skipped for BACKOFF_BASE_S * 2^(failures-1), capped
+BACKOFF_BASE_S = 60
+BACKOFF_MAX_S = 6 * 3600
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status: str                 # 'updated' | 'not_modified' | 'skipped' | 'error'
+    text: Optional[str]         # body (the cached copy for not_modified / skipped)
+    error: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.text is not None
+
+
+class CalendarFetcher:
+    """
+    Fetches calendar URLs over one pooled session, in parallel.
+
+    Each URL's validators (ETag / Last-Modified) and failure count are kept in
+    a small JSON state file and its last body in a cache file, so an unchanged
+    feed costs one 304 round-trip and a failing feed is not retried until its
+    backoff expires. `session` can be swapped for tests against a local server.
+    """
+
+    def __init__(self, state_path=FETCH_STATE_PATH, cache_dir=FETCH_CACHE_DIR,
+                 timeout=FETCH_TIMEOUT, max_workers=FETCH_MAX_WORKERS, session=None):
+        self.state_path = state_path
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = session or self._new_session(max_workers)
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    @staticmethod
+    def _new_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def cache_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".ics")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_body(path, text):
+        # Readers (other sessions) only ever see the old or the new body, never a partial one
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def fetch(self, url, cache_path=None, verify=True) -> FetchResult:
+        """Conditionally fetch one URL; the body is stored at `cache_path`."""
+        cache_path = cache_path or self.cache_path(url)
+        with self._lock:
+            entry = dict(self._state.get(url, {}))
+
+        cached = self._read(cache_path)
+        if entry.get("retry_after", 0) > time.time():
+            return FetchResult(url, "skipped", cached, entry.get("last_error"))
+
+        headers = {}
+        if cached is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, verify=verify)
+            if response.status_code == 304 and cached is not None:
+                result = FetchResult(url, "not_modified", cached)
+            else:
+                response.raise_for_status()
+                self._write_body(cache_path, response.text)
+                entry["etag"] = response.headers.get("ETag")
+                entry["last_modified"] = response.headers.get("Last-Modified")
+                result = FetchResult(url, "updated", response.text)
+            entry.update(failures=0, retry_after=0, last_error=None, last_checked=time.time())
+        except requests.exceptions.RequestException as e:
+            failures = entry.get("failures", 0) + 1
+            delay = min(BACKOFF_BASE_S * 2 ** (failures - 1), BACKOFF_MAX_S)
+            entry.update(failures=failures, retry_after=time.time() + delay, last_error=str(e))
+            result = FetchResult(url, "error", cached, str(e))
+
+        with self._lock:
+            self._state[url] = entry
+        return result
+
+    def fetch_all(self, urls: Iterable[str], verify=True) -> Dict[str, FetchResult]:
+        """Fetch several URLs concurrently; results keyed by URL."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            results = list(pool.map(lambda u: self.fetch(u, verify=verify), urls))
+        self.save()
+        return dict(zip(urls, results))
+
+    def save(self):
+        with self._lock:
+            self._save_state()
+
+
+@st.cache_resource(show_spinner=False)
+def get_calendar_fetcher() -> CalendarFetcher:
+    """One fetcher per process, so the session's connection pool is reused across reruns."""
+    return CalendarFetcher()
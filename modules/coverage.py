@@ -0,0 +1,180 @@
+# modules/coverage.py
+# Nearest police station, distance and coverage-gap analysis for calls.
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from modules.spatial_index import haversine_m
+
+STATIONS_PATH = os.path.join("data", "police_stations.csv")
+
+# Column names accepted for the station table
+STATION_NAME_COLUMNS = ["station", "police_station", "name"]
+STATION_LAT_COLUMNS = ["lat", "latitude", "station_lat"]
+STATION_LON_COLUMNS = ["lon", "lng", "longitude", "station_lon"]
+
+# Coarse cells used to prune candidate stations (~5.5 km)
+SEARCH_CELL_DEG = 0.05
+
+DISTANCE_BINS_KM = [0, 1, 2, 5, 10, 20, np.inf]
+FAR_FROM_STATION_KM = 5.0
+
+
+def _pick_column(df, candidates):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    raise ValueError(f"Station table needs one of the columns: {', '.join(candidates)}")
+
+
+def load_stations(path=STATIONS_PATH):
+    """Load the station table (CSV/XLSX) as columns station, lat, lon, or None if missing."""
+    if not os.path.exists(path):
+        return None
+    raw = pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+    raw.columns = raw.columns.str.strip().str.lower()
+    stations = pd.DataFrame({
+        "station": raw[_pick_column(raw, STATION_NAME_COLUMNS)].astype(str).str.strip(),
+        "lat": pd.to_numeric(raw[_pick_column(raw, STATION_LAT_COLUMNS)], errors="coerce"),
+        "lon": pd.to_numeric(raw[_pick_column(raw, STATION_LON_COLUMNS)], errors="coerce"),
+    })
+    return stations.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False)
+def _load_stations_cached(path, mtime):
+    return load_stations(path)
+
+
+def get_stations(path=STATIONS_PATH):
+    """Cached station table; reloaded when the file changes."""
+    if not os.path.exists(path):
+        return None
+    return _load_stations_cached(path, os.path.getmtime(path))
+
+
+def nearest_stations(lat, lon, station_lat, station_lon, cell_deg=SEARCH_CELL_DEG):
+    """
+    Index of, and haversine distance (m) to, the nearest station for every point.
+
+    Points are bucketed on a coarse grid; for each occupied cell only stations
+    that can be the nearest to some point of the cell are compared, in an
+    equirectangular plane around the data's mid-latitude (near-ties may
+    resolve to a station a few metres farther than the true nearest).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    station_lat = np.asarray(station_lat, dtype=np.float64)
+    station_lon = np.asarray(station_lon, dtype=np.float64)
+
+    nearest = np.full(len(lat), -1, dtype=np.int64)
+    distance = np.full(len(lat), np.nan)
+    valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    if len(valid) == 0 or len(station_lat) == 0:
+        return nearest, distance
+
+    kx = np.cos(np.radians(np.median(lat[valid])))
+    px, py = lon[valid] * kx, lat[valid]
+    sx, sy = station_lon * kx, station_lat
+
+    lat0, lon0 = lat[valid].min(), lon[valid].min()
+    ix = ((lon[valid] - lon0) // cell_deg).astype(np.int64)
+    iy = ((lat[valid] - lat0) // cell_deg).astype(np.int64)
+    cell = ix * (iy.max() + 1) + iy
+    order = np.argsort(cell, kind="stable")
+    cells, starts = np.unique(cell[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+
+    # Cell boxes in the projected plane
+    cx0 = (lon0 + ix[order][starts] * cell_deg) * kx
+    cy0 = lat0 + iy[order][starts] * cell_deg
+    cx1, cy1 = cx0 + cell_deg * kx, cy0 + cell_deg
+
+    # Min / max squared distance from each cell box to each station (cells x stations)
+    dx_min = np.maximum(np.maximum(cx0[:, None] - sx, sx - cx1[:, None]), 0)
+    dy_min = np.maximum(np.maximum(cy0[:, None] - sy, sy - cy1[:, None]), 0)
+    dx_max = np.maximum(np.abs(sx - cx0[:, None]), np.abs(sx - cx1[:, None]))
+    dy_max = np.maximum(np.abs(sy - cy0[:, None]), np.abs(sy - cy1[:, None]))
+    d_min = dx_min ** 2 + dy_min ** 2
+    bound = (dx_max ** 2 + dy_max ** 2).min(axis=1)
+    candidates = d_min <= bound[:, None]
+
+    best = np.empty(len(valid), dtype=np.int64)
+    for c in range(len(cells)):
+        rows = order[starts[c]:ends[c]]
+        cand = np.flatnonzero(candidates[c])
+        d2 = (px[rows, None] - sx[cand]) ** 2 + (py[rows, None] - sy[cand]) ** 2
+        best[rows] = cand[d2.argmin(axis=1)]
+
+    nearest[valid] = best
+    distance[valid] = haversine_m(lat[valid], lon[valid], station_lat[best], station_lon[best])
+    return nearest, distance
+
+
+def assign_nearest_station(df, stations, lat_col="caller_lat", lon_col="caller_lon"):
+    """Copy of df with `nearest_station` and `station_distance_km` columns."""
+    df = df.copy()
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    idx, dist_m = nearest_stations(lat, lon, stations["lat"].to_numpy(), stations["lon"].to_numpy())
+
+    names = np.append(stations["station"].to_numpy(dtype=object), None)
+    df["nearest_station"] = names[idx]
+    df["station_distance_km"] = dist_m / 1000.0
+    return df
+
+
+def distance_response_profile(df, bins=DISTANCE_BINS_KM):
+    """Call count and response time per distance-to-station band."""
+    if df.empty or "station_distance_km" not in df.columns:
+        return pd.DataFrame(columns=["distance_band", "calls", "mean_response_min", "median_response_min"])
+
+    band = pd.cut(df["station_distance_km"], bins=bins, right=False)
+    response = (pd.to_numeric(df["response_time_min"], errors="coerce")
+                if "response_time_min" in df.columns else pd.Series(np.nan, index=df.index))
+    profile = (pd.DataFrame({"distance_band": band, "response": response})
+               .groupby("distance_band", observed=True)["response"]
+               .agg(calls="size", mean_response_min="mean", median_response_min="median")
+               .reset_index())
+    profile["distance_band"] = profile["distance_band"].astype(str)
+    return profile
+
+
+def coverage_gaps(df, cell_deg=0.01, far_km=FAR_FROM_STATION_KM, lat_col="caller_lat", lon_col="caller_lon"):
+    """
+    Per-grid-cell coverage summary: calls, mean distance to the nearest station,
+    share of calls farther than `far_km`, and mean response time. Worst cells first.
+    """
+    cols = ["cell_lat", "cell_lon", "calls", "mean_distance_km", "far_share", "mean_response_min"]
+    if df.empty or "station_distance_km" not in df.columns:
+        return pd.DataFrame(columns=cols)
+
+    lat = pd.to_numeric(df[lat_col], errors="coerce")
+    lon = pd.to_numeric(df[lon_col], errors="coerce")
+    grid = pd.DataFrame({
+        "cell_lat": (np.floor(lat / cell_deg) + 0.5) * cell_deg,
+        "cell_lon": (np.floor(lon / cell_deg) + 0.5) * cell_deg,
+        "distance": df["station_distance_km"],
+        "far": df["station_distance_km"] > far_km,
+        "response": (pd.to_numeric(df["response_time_min"], errors="coerce")
+                     if "response_time_min" in df.columns else np.nan),
+    }).dropna(subset=["cell_lat", "cell_lon", "distance"])
+
+    gaps = (grid.groupby(["cell_lat", "cell_lon"])
+            .agg(calls=("distance", "size"), mean_distance_km=("distance", "mean"),
+                 far_share=("far", "mean"), mean_response_min=("response", "mean"))
+            .reset_index())
+    return gaps.sort_values(["far_share", "calls"], ascending=False, ignore_index=True)[cols]
+
+
+@st.cache_data(show_spinner=False)
+def get_station_coverage(filter_key, _df, stations_mtime):
+    """Nearest-station columns, distance profile and coverage gaps per filter fingerprint."""
+    stations = get_stations()
+    calls = assign_nearest_station(_df, stations)
+    return {
+        "calls": calls[["nearest_station", "station_distance_km"]],
+        "profile": distance_response_profile(calls),
+        "gaps": coverage_gaps(calls),
+    }
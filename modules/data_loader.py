@@ -1,4 +1,5 @@
 # modules/data_loader.py
+import hashlib
 import pandas as pd
 import streamlit as st
 from config import REQUIRED_COLUMNS
@@ -26,6 +27,7 @@ def load_data(source):
 
         metadata = {
             "file_name": file_name,
+            "content_hash": _content_hash(source),
             "record_count": len(df),
             "columns": df.columns.tolist()
         }
@@ -35,6 +37,15 @@ def load_data(source):
         st.error(f"Failed to load data: {e}")
         return None, None
 
+def _content_hash(source):
+    """Digest of the file's bytes; identifies the dataset in caches shared across sessions."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            data = f.read()
+    else:
+        data = source.getvalue()
+    return hashlib.sha1(data).hexdigest()
+
 def preprocess(df):
     """Basic preprocessing: column names, date parsing, and ensuring timezone-naive datetimes."""
     if df is None:
@@ -55,4 +66,8 @@ def preprocess(df):
         df["hour"] = df["call_ts"].dt.hour
         df["weekday"] = df["call_ts"].dt.day_name()
     
-    return df
\ No newline at end of file
+    return df
+
+def fingerprint(*parts):
+    """Short stable hash of filter selections / dataset identity, for cache keys."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
\ No newline at end of file
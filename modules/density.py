@@ -0,0 +1,124 @@
+# modules/density.py
+# Server-side kernel density raster for the hotspot heatmap.
+import base64
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import GOA_BOUNDS
+
+METERS_PER_DEG_LAT = 111320.0
+
+# ~440 m cells over the Goa bounding box (375 x 500 grid)
+KDE_CELL_DEG = 0.004
+KDE_BANDWIDTH_M = 750.0
+
+# Colour ramp (value in 0-1 -> RGBA); below the first stop is transparent
+KDE_COLOR_STOPS = [
+    (0.05, [0, 0, 255, 25]),    # blue
+    (0.25, [0, 255, 255, 85]),  # cyan
+    (0.50, [0, 255, 0, 170]),   # green
+    (0.75, [255, 255, 0, 200]), # yellow
+    (1.00, [255, 0, 0, 255]),   # red
+]
+
+
+def _gaussian_kernel(sigma_x, sigma_y):
+    """Normalised 2D Gaussian covering +/- 4 sigma (rows = y, cols = x)."""
+    rx = max(int(np.ceil(4 * sigma_x)), 1)
+    ry = max(int(np.ceil(4 * sigma_y)), 1)
+    x = np.arange(-rx, rx + 1) / sigma_x
+    y = np.arange(-ry, ry + 1) / sigma_y
+    kernel = np.exp(-0.5 * (y[:, None] ** 2 + x[None, :] ** 2))
+    return kernel / kernel.sum()
+
+
+def _fft_convolve_same(grid, kernel):
+    """Linear (zero-padded) convolution of grid with kernel, cropped to grid's shape."""
+    ky, kx = kernel.shape
+    shape = (grid.shape[0] + ky - 1, grid.shape[1] + kx - 1)
+    out = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    oy, ox = ky // 2, kx // 2
+    return out[oy:oy + grid.shape[0], ox:ox + grid.shape[1]]
+
+
+def kde_raster(lat, lon, bounds=GOA_BOUNDS, cell_deg=KDE_CELL_DEG, bandwidth_m=KDE_BANDWIDTH_M):
+    """
+    Gaussian KDE of call locations on a fixed grid over `bounds`.
+
+    Returns a dict with `density` (calls per km^2, row 0 = southernmost),
+    the grid `bounds` as [lon_min, lat_min, lon_max, lat_max] and the count
+    of calls that fell inside the grid.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ny = int(round((bounds['lat_max'] - bounds['lat_min']) / cell_deg))
+    nx = int(round((bounds['lon_max'] - bounds['lon_min']) / cell_deg))
+
+    counts, _, _ = np.histogram2d(
+        lat, lon, bins=(ny, nx),
+        range=[[bounds['lat_min'], bounds['lat_max']], [bounds['lon_min'], bounds['lon_max']]]
+    )
+
+    mid_lat = np.radians((bounds['lat_min'] + bounds['lat_max']) / 2.0)
+    cell_h_m = cell_deg * METERS_PER_DEG_LAT
+    cell_w_m = cell_deg * METERS_PER_DEG_LAT * np.cos(mid_lat)
+    kernel = _gaussian_kernel(bandwidth_m / cell_w_m, bandwidth_m / cell_h_m)
+
+    smoothed = _fft_convolve_same(counts, kernel) if counts.any() else counts
+    density = np.clip(smoothed, 0.0, None) / (cell_h_m * cell_w_m / 1e6)
+
+    return {
+        "density": density.astype(np.float32),
+        "bounds": [bounds['lon_min'], bounds['lat_min'], bounds['lon_max'], bounds['lat_max']],
+        "n_calls": int(counts.sum()),
+        "bandwidth_m": bandwidth_m,
+    }
+
+
+def colorize(density, vmax=None):
+    """Map density to RGBA (uint8) with the heatmap colour ramp."""
+    if vmax is None:
+        positive = density[density > 0]
+        vmax = float(np.percentile(positive, 99.5)) if positive.size else 1.0
+    value = np.clip(density / max(vmax, 1e-12), 0.0, 1.0)
+
+    stops = np.array([s for s, _ in KDE_COLOR_STOPS])
+    colors = np.array([c for _, c in KDE_COLOR_STOPS], dtype=np.float64)
+    rgba = np.empty(density.shape + (4,), dtype=np.float64)
+    for channel in range(4):
+        rgba[..., channel] = np.interp(value, stops, colors[:, channel])
+    rgba[value < stops[0]] = 0
+    return rgba.round().astype(np.uint8), vmax
+
+
+def rgba_to_png_data_url(rgba):
+    """Encode an (H, W, 4) uint8 array as a PNG data URL (top row first)."""
+    height, width = rgba.shape[:2]
+    raw = b"".join(b"\x00" + rgba[row].tobytes() for row in range(height))
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data +
+                struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    png = (b"\x89PNG\r\n\x1a\n" +
+           chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)) +
+           chunk(b"IDAT", zlib.compress(raw, 6)) +
+           chunk(b"IEND", b""))
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_kde_raster(filter_key, _df, lat_col="caller_lat", lon_col="caller_lon"):
+    """KDE raster plus its PNG rendering, computed once per filter fingerprint."""
+    lat = pd.to_numeric(_df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(_df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    raster = kde_raster(lat[valid], lon[valid])
+    rgba, vmax = colorize(raster["density"])
+    # Image rows run north to south
+    raster["image"] = rgba_to_png_data_url(rgba[::-1])
+    raster["vmax"] = vmax
+    return raster
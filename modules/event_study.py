@@ -0,0 +1,174 @@
+# modules/event_study.py
+# Festival event study: every occurrence of each festival aligned on a relative-day axis.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+EVENT_WINDOW_DAYS = 3
+# Days either side of the festival pooled into the headline "window" uplift
+EVENT_CORE_DAYS = 1
+# Need at least this many non-festival days for the baseline, else all days are used
+MIN_BASELINE_DAYS = 28
+CI_Z = 1.96
+
+
+def daily_count_matrix(df, date_col="date", group_cols=("category", "jurisdiction")):
+    """
+    Calls per day as one (groups x days) matrix over a contiguous day axis.
+
+    Row 0 is all calls, followed by one row per value of each column in
+    `group_cols`. `groups` describes the rows (group_type, group).
+    """
+    dates = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+    valid = dates.notna().to_numpy()
+    if not valid.any():
+        return {"days": pd.DatetimeIndex([]), "groups": pd.DataFrame(columns=["group_type", "group"]),
+                "counts": np.zeros((0, 0))}
+
+    first, last = dates[valid].min(), dates[valid].max()
+    n_days = (last - first).days + 1
+    day = (dates[valid] - first).dt.days.to_numpy()
+
+    group_rows = [("all", "All")]
+    flat = [day]
+    for col in group_cols:
+        if col not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df.loc[valid, col])
+        has = codes >= 0
+        flat.append((len(group_rows) + codes[has]) * n_days + day[has])
+        group_rows += [(col, str(u)) for u in uniques]
+
+    counts = np.bincount(np.concatenate(flat), minlength=len(group_rows) * n_days)
+    return {
+        "days": pd.date_range(first, periods=n_days, freq="D"),
+        "groups": pd.DataFrame(group_rows, columns=["group_type", "group"]),
+        "counts": counts.reshape(len(group_rows), n_days).astype(np.float64),
+    }
+
+
+def _group_stats(values, valid, starts):
+    """
+    Per-festival mean and normal-approximation CI of `values` (G x E x ...)
+    over occurrences, with occurrences sorted by festival and `starts` the
+    first occurrence of each festival.
+    """
+    x = np.where(valid, values, 0.0)
+    n = np.add.reduceat(valid.astype(np.float64), starts, axis=1)
+    s1 = np.add.reduceat(x, starts, axis=1)
+    s2 = np.add.reduceat(x * x, starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / n
+        var = (s2 - n * mean ** 2) / (n - 1)
+        half = CI_Z * np.sqrt(np.clip(var, 0.0, None) / n)
+    half = np.where(n > 1, half, np.nan)
+    return n, mean, mean - half, mean + half
+
+
+def event_study(matrix, festivals, window=EVENT_WINDOW_DAYS, core=EVENT_CORE_DAYS):
+    """
+    Align every occurrence of each festival (list of (name, start, end)) on
+    relative days -window..+window around its start and compare observed calls
+    with a day-of-week baseline from non-festival days, for every group row.
+
+    Uplift is observed / expected - 1, averaged over a festival's occurrences
+    with a 95% normal-approximation CI (needs two or more occurrences).
+    Returns `by_day` (one row per festival, group, relative day) and `window`
+    (days -core..+core pooled per occurrence).
+    """
+    counts, days, groups = matrix["counts"], matrix["days"], matrix["groups"]
+    by_day_cols = ["festival", "group_type", "group", "rel_day", "occurrences",
+                   "observed", "expected", "uplift", "ci_low", "ci_high"]
+    window_cols = [c for c in by_day_cols if c != "rel_day"]
+    if counts.size == 0 or not festivals:
+        return {"by_day": pd.DataFrame(columns=by_day_cols), "window": pd.DataFrame(columns=window_cols)}
+
+    n_days = counts.shape[1]
+    occ = pd.DataFrame({
+        "festival": [str(f[0]).strip() for f in festivals],
+        "anchor": (pd.to_datetime([f[1] for f in festivals]).normalize() - days[0]).days,
+    }).drop_duplicates()
+    occ = occ[(occ["anchor"] >= 0) & (occ["anchor"] < n_days)].sort_values(["festival", "anchor"])
+    if occ.empty:
+        return {"by_day": pd.DataFrame(columns=by_day_cols), "window": pd.DataFrame(columns=window_cols)}
+
+    festival_names, starts = np.unique(occ["festival"].to_numpy(), return_index=True)
+    rel = np.arange(-window, window + 1)
+    idx = occ["anchor"].to_numpy()[:, None] + rel[None, :]               # E x W
+    inside = (idx >= 0) & (idx < n_days)
+    idx_c = np.clip(idx, 0, n_days - 1)
+
+    # Day-of-week baseline per group from days outside every festival window
+    base_days = np.ones(n_days, dtype=bool)
+    base_days[idx[inside]] = False
+    if base_days.sum() < MIN_BASELINE_DAYS:
+        base_days[:] = True
+    dow = days.dayofweek.to_numpy()
+    dow_days = np.bincount(dow[base_days], minlength=7)
+    dow_sum = counts[:, base_days] @ np.eye(7)[dow[base_days]]
+    overall = counts[:, base_days].mean(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        baseline = np.where(dow_days > 0, dow_sum / dow_days, overall)  # G x 7
+
+    observed = counts[:, idx_c]                                        # G x E x W
+    expected = baseline[:, dow[idx_c]]
+    valid = inside[None, :, :] & (expected > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        uplift = observed / expected - 1.0
+
+    n, mean, lo, hi = _group_stats(uplift, valid, starts)               # G x F x W
+    _, obs_mean, _, _ = _group_stats(observed, valid, starts)
+    _, exp_mean, _, _ = _group_stats(expected, valid, starts)
+
+    G, F, W = n.shape
+    g, f, w = np.meshgrid(np.arange(G), np.arange(F), np.arange(W), indexing="ij")
+    by_day = pd.DataFrame({
+        "festival": festival_names[f.ravel()],
+        "group_type": groups["group_type"].to_numpy()[g.ravel()],
+        "group": groups["group"].to_numpy()[g.ravel()],
+        "rel_day": rel[w.ravel()],
+        "occurrences": n.ravel().astype(int),
+        "observed": obs_mean.ravel(),
+        "expected": exp_mean.ravel(),
+        "uplift": mean.ravel(),
+        "ci_low": lo.ravel(),
+        "ci_high": hi.ravel(),
+    })
+
+    # Pooled core window per occurrence: sum(observed) / sum(expected) - 1
+    core_w = np.abs(rel) <= core
+    core_valid = valid[:, :, core_w]
+    obs_core = np.where(core_valid, observed[:, :, core_w], 0.0).sum(axis=2)
+    exp_core = np.where(core_valid, expected[:, :, core_w], 0.0).sum(axis=2)
+    has_core = exp_core > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        core_uplift = obs_core / exp_core - 1.0
+    wn, wmean, wlo, whi = _group_stats(core_uplift, has_core, starts)   # G x F
+    _, wobs, _, _ = _group_stats(obs_core, has_core, starts)
+    _, wexp, _, _ = _group_stats(exp_core, has_core, starts)
+
+    g2, f2 = np.meshgrid(np.arange(G), np.arange(F), indexing="ij")
+    window_df = pd.DataFrame({
+        "festival": festival_names[f2.ravel()],
+        "group_type": groups["group_type"].to_numpy()[g2.ravel()],
+        "group": groups["group"].to_numpy()[g2.ravel()],
+        "occurrences": wn.ravel().astype(int),
+        "observed": wobs.ravel(),
+        "expected": wexp.ravel(),
+        "uplift": wmean.ravel(),
+        "ci_low": wlo.ravel(),
+        "ci_high": whi.ravel(),
+    })
+
+    return {
+        "by_day": by_day[by_day["occurrences"] > 0].reset_index(drop=True),
+        "window": window_df[window_df["occurrences"] > 0]
+                  .sort_values(["group_type", "group", "uplift"], ascending=[True, True, False],
+                               ignore_index=True),
+    }
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_event_study(dataset_key, _df, festival_version, _festivals, window=EVENT_WINDOW_DAYS):
+    """Event study per dataset, calendar version and window."""
+    return event_study(daily_count_matrix(_df), _festivals, window=window)
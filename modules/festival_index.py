@@ -0,0 +1,101 @@
+# modules/festival_index.py
+# Sorted interval index over festivals for overlap / stabbing queries.
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+class FestivalIntervalIndex:
+    """
+    Festivals as closed intervals [start, end], sorted by start.
+
+    An interval overlapping [a, b] must start in [a - longest_span, b], so each
+    query is two binary searches (np.searchsorted) plus a filter over that
+    slice. Results come back in the original list order.
+    """
+
+    def __init__(self, festivals):
+        festivals = list(festivals)
+        names = [f[0] for f in festivals]
+        starts = pd.to_datetime([f[1] for f in festivals]).values.astype("datetime64[ns]")
+        ends = pd.to_datetime([f[2] for f in festivals]).values.astype("datetime64[ns]")
+
+        order = np.argsort(starts, kind="stable")
+        self.positions = order                      # original list position of each sorted entry
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.names = np.asarray(names, dtype=object)[order] if festivals else np.empty(0, dtype=object)
+        spans = self.ends - self.starts
+        self.max_span = spans.max() if len(spans) else np.timedelta64(0, "ns")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _overlapping(self, start, end):
+        """Sorted-array slots of intervals overlapping [start, end], in original order."""
+        a = np.datetime64(pd.Timestamp(start).to_datetime64(), "ns")
+        b = np.datetime64(pd.Timestamp(end).to_datetime64(), "ns")
+        lo = np.searchsorted(self.starts, a - self.max_span, side="left")
+        hi = np.searchsorted(self.starts, b, side="right")
+        slots = lo + np.flatnonzero(self.ends[lo:hi] >= a)
+        return slots[np.argsort(self.positions[slots], kind="stable")]
+
+    def overlapping_positions(self, start, end):
+        """Original list positions of festivals overlapping [start, end]."""
+        return self.positions[self._overlapping(start, end)]
+
+    def in_range(self, start, end):
+        """(name, start, end) Timestamps of festivals overlapping [start, end]."""
+        return [(self.names[i], pd.Timestamp(self.starts[i]), pd.Timestamp(self.ends[i]))
+                for i in self._overlapping(start, end)]
+
+    def at(self, ts):
+        """Names of festivals containing the instant `ts`."""
+        return [self.names[i] for i in self._overlapping(ts, ts)]
+
+    def tag(self, timestamps, default="Non-Festival"):
+        """
+        Name of the first festival (in list order) containing each timestamp,
+        or `default`. Only festivals overlapping the timestamps' span are tested.
+        """
+        ts = pd.to_datetime(pd.Series(timestamps)).values.astype("datetime64[ns]")
+        tags = np.full(len(ts), default, dtype=object)
+        valid = ~np.isnat(ts)
+        if not valid.any() or len(self) == 0:
+            return tags
+        # Reverse order so the earliest festival in the list wins
+        for i in self._overlapping(ts[valid].min(), ts[valid].max())[::-1]:
+            tags[(ts >= self.starts[i]) & (ts <= self.ends[i])] = self.names[i]
+        return tags
+
+    def day_map(self, start, end):
+        """{'YYYY-MM-DD': [names]} for every day of each festival overlapping [start, end]."""
+        first, last = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+        day_map = {}
+        for i in self._overlapping(pd.Timestamp(first), pd.Timestamp(last) + pd.Timedelta(days=1) - pd.Timedelta(1)):
+            cur = max(pd.Timestamp(self.starts[i]).date(), first)
+            endd = min(pd.Timestamp(self.ends[i]).date(), last)
+            while cur <= endd:
+                day_map.setdefault(cur.isoformat(), []).append(self.names[i])
+                cur = cur + timedelta(days=1)
+        return day_map
+
+    def full_day_map(self):
+        """day_map over the whole calendar."""
+        if len(self) == 0:
+            return {}
+        return self.day_map(self.starts.min(), self.ends.max())
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_festival_index(calendar_version, _festivals):
+    """One index per calendar version, shared by every caller and session."""
+    return FestivalIntervalIndex(_festivals)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_festival_day_map(calendar_version, _index):
+    """{'YYYY-MM-DD': [names]} for every festival day, expanded once per calendar version."""
+    return _index.full_day_map()
@@ -0,0 +1,184 @@
+# modules/festival_store.py
+# Compact columnar festival store: many events per day, range scans without per-event objects.
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class FestivalStore:
+    """
+    Festivals as parallel arrays sorted by (day, second):
+
+    - day:         int32 proleptic Gregorian ordinal (date.toordinal())
+    - second:      int32 seconds since midnight (0 for all-day events)
+    - name_id / source_id / description_id: int32 ids into string tables
+
+    Several events can share a day. Range queries are binary searches on the
+    combined (day, second) key; dicts are only built for rows a caller asks for.
+    """
+
+    def __init__(self, day, second, name_id, source_id, description_id,
+                 names: List[str], sources: List[str], descriptions: List[str]):
+        order = np.lexsort((np.asarray(second), np.asarray(day)))
+        self.day = np.asarray(day, dtype=np.int32)[order]
+        self.second = np.asarray(second, dtype=np.int32)[order]
+        self.name_id = np.asarray(name_id, dtype=np.int32)[order]
+        self.source_id = np.asarray(source_id, dtype=np.int32)[order]
+        self.description_id = np.asarray(description_id, dtype=np.int32)[order]
+        self.names = list(names)
+        self.sources = list(sources)
+        self.descriptions = list(descriptions)
+        self._key = self.day.astype(np.int64) * 86400 + self.second
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def empty(cls) -> "FestivalStore":
+        return cls([], [], [], [], [], [], [], [])
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "FestivalStore":
+        """Build from dicts with 'name', 'date' (datetime) and optional 'description' / 'source'."""
+        tables = {"name": {}, "source": {}, "description": {}}
+        columns = {"day": [], "second": [], "name": [], "source": [], "description": []}
+        for record in records:
+            when = record['date']
+            if not isinstance(when, datetime):
+                when = datetime.combine(when, datetime.min.time())
+            columns["day"].append(when.toordinal())
+            columns["second"].append(when.hour * 3600 + when.minute * 60 + when.second)
+            for field, default in (("name", ""), ("source", "unknown"), ("description", "")):
+                value = str(record.get(field) or default)
+                table = tables[field]
+                columns[field].append(table.setdefault(value, len(table)))
+        return cls(columns["day"], columns["second"], columns["name"], columns["source"],
+                   columns["description"], list(tables["name"]), list(tables["source"]),
+                   list(tables["description"]))
+
+    @classmethod
+    def from_legacy_dict(cls, festivals: Dict[str, Dict]) -> "FestivalStore":
+        """Build from the old {'YYYY-MM-DD': {...}} database layout."""
+        records = []
+        for info in festivals.values():
+            record = dict(info)
+            if isinstance(record.get('date'), str):
+                record['date'] = datetime.fromisoformat(record['date'])
+            records.append(record)
+        return cls.from_records(records)
+
+    def save(self, path: str):
+        """Persist as an uncompressed .npz (string tables as fixed-width unicode)."""
+        np.savez(
+            path,
+            day=self.day, second=self.second, name_id=self.name_id,
+            source_id=self.source_id, description_id=self.description_id,
+            names=np.array(self.names, dtype=str), sources=np.array(self.sources, dtype=str),
+            descriptions=np.array(self.descriptions, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FestivalStore":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["day"], data["second"], data["name_id"], data["source_id"],
+                       data["description_id"], data["names"].tolist(), data["sources"].tolist(),
+                       data["descriptions"].tolist())
+
+    def merged(self, other: "FestivalStore") -> "FestivalStore":
+        """
+        Union of two stores. Events with the same day and (case-insensitive) name
+        are kept once, preferring the longer description.
+        """
+        records = list(self.records()) + list(other.records())
+        best = {}
+        for record in records:
+            key = (record['date'].date(), record['name'].strip().lower())
+            current = best.get(key)
+            if current is None or len(record.get('description', '')) > len(current.get('description', '')):
+                best[key] = record
+        return FestivalStore.from_records(best.values())
+
+    def range_slice(self, start: datetime, end: datetime):
+        """(lo, hi) row bounds of events with start <= date <= end."""
+        lo_key = _to_key(start)
+        hi_key = _to_key(end)
+        lo = int(np.searchsorted(self._key, lo_key, side="left"))
+        hi = int(np.searchsorted(self._key, hi_key, side="right"))
+        return lo, max(lo, hi)
+
+    def count_in_range(self, start: datetime, end: datetime) -> int:
+        lo, hi = self.range_slice(start, end)
+        return hi - lo
+
+    def arrays_in_range(self, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        """Column slices (no per-event objects) for vectorised consumers."""
+        lo, hi = self.range_slice(start, end)
+        return {
+            "day": self.day[lo:hi],
+            "second": self.second[lo:hi],
+            "name_id": self.name_id[lo:hi],
+            "source_id": self.source_id[lo:hi],
+        }
+
+    def dates(self, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        """datetime64[s] of rows lo:hi."""
+        days = (self.day[lo:hi].astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+        return days.astype("datetime64[s]") + self.second[lo:hi].astype("timedelta64[s]")
+
+    def record(self, i: int) -> Dict:
+        """Materialise row i as the classic festival dict."""
+        return {
+            'name': self.names[self.name_id[i]],
+            'date': datetime.fromordinal(int(self.day[i])) + timedelta(seconds=int(self.second[i])),
+            'description': self.descriptions[self.description_id[i]],
+            'source': self.sources[self.source_id[i]],
+        }
+
+    def records(self, lo: int = 0, hi: Optional[int] = None):
+        hi = len(self) if hi is None else hi
+        for i in range(lo, hi):
+            yield self.record(i)
+
+    def keyed_records(self, lo: int = 0, hi: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        {key: festival dict} for rows lo:hi. The first event of a day is keyed
+        'YYYY-MM-DD'; further events that day get '#2', '#3', ... suffixes.
+        """
+        hi = len(self) if hi is None else hi
+        out = {}
+        previous_day, n_same_day = None, 0
+        for i in range(lo, hi):
+            day = int(self.day[i])
+            n_same_day = n_same_day + 1 if day == previous_day else 1
+            previous_day = day
+            key = date.fromordinal(day).isoformat()
+            if n_same_day > 1:
+                key = f"{key}#{n_same_day}"
+            out[key] = self.record(i)
+        return out
+
+    def year_counts(self) -> Dict[str, int]:
+        """{'YYYY': number of events}."""
+        if len(self) == 0:
+            return {}
+        years = self.dates().astype("datetime64[Y]").astype(np.int64) + 1970
+        uniq, counts = np.unique(years, return_counts=True)
+        return {str(y): int(c) for y, c in zip(uniq, counts)}
+
+    def year_span(self):
+        """(first_year, last_year) or None when empty."""
+        if len(self) == 0:
+            return None
+        return date.fromordinal(int(self.day[0])).year, date.fromordinal(int(self.day[-1])).year
+
+    def source_names(self) -> List[str]:
+        return [self.sources[i] for i in np.unique(self.source_id)]
+
+
+def _to_key(value) -> int:
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.toordinal() * 86400 + value.hour * 3600 + value.minute * 60 + value.second
@@ -1,37 +1,49 @@
 # modules/festivals_ics.py
 import os
-import requests
-from ics import Calendar
+import pickle
+import re
 from datetime import datetime
 import streamlit as st
+from modules.calendar_fetch import get_calendar_fetcher
 
 # --- Define URL and local file path ---
 ICS_URL = "https://www.officeholidays.com/ics/india"
 ICS_FILE_PATH = os.path.join("data", "festivals.ics")
 DATA_DIR = "data"
+# Parsed (name, start, end) tuples, keyed on the ICS file's mtime and size
+ICS_CACHE_PATH = os.path.join(DATA_DIR, "festivals_ics.pkl")
+ICS_CACHE_VERSION = 1
+
+_ICS_ESCAPE = re.compile(r"\\([\\;,nN])")
 
 def download_and_save_ics():
     """
     Downloads the ICS file from the URL and saves it locally.
+    Sends the stored ETag / Last-Modified, so an unchanged calendar is a 304
+    and the local file (and its parse cache) is left as is.
     Returns True on success, False on failure.
     """
-    try:
-        # Ensure the 'data' directory exists
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
-            
-        response = requests.get(ICS_URL, verify=False) # Added verify=False to bypass SSL issues
-        response.raise_for_status()
-        
-        with open(ICS_FILE_PATH, 'w') as f:
-            f.write(response.text)
+    # Ensure the 'data' directory exists
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
         
-        # The st.info message was removed from here
+    # verify=False to bypass SSL issues with the calendar host
+    result = get_calendar_fetcher().fetch(ICS_URL, cache_path=ICS_FILE_PATH, verify=False)
+    get_calendar_fetcher().save()
+    if result.status in ("updated", "not_modified"):
         return True
-    except requests.exceptions.RequestException as e:
-        # Errors will still be shown so you can debug if the download fails
-        st.error(f"Error downloading festival calendar: {e}. Please check your internet connection.")
-        return False
+    
+    # Errors will still be shown so you can debug if the download fails
+    st.error(f"Error downloading festival calendar: {result.error}. Please check your internet connection.")
+    return False
+
+def calendar_version(path=ICS_FILE_PATH):
+    """(mtime, size) of the local ICS file; changes whenever the calendar is re-downloaded."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 @st.cache_data(ttl=86400)  # cache the parsed data for 24 hours
 def fetch_festivals_from_ics():
@@ -47,25 +59,88 @@ def fetch_festivals_from_ics():
 
     # Now, proceed with reading from the local file
     try:
-        with open(ICS_FILE_PATH, 'r') as f:
-            ics_content = f.read()
-        
-        cal = Calendar(ics_content)
-        
-        festivals = []
-        for event in cal.events:
-            if event.begin and event.end:
-                start_dt = event.begin.datetime
-                end_dt = event.end.datetime
-
-                # Make datetimes timezone-naive
-                if start_dt.tzinfo:
-                    start_dt = start_dt.replace(tzinfo=None)
-                if end_dt.tzinfo:
-                    end_dt = end_dt.replace(tzinfo=None)
-
-                festivals.append((event.name, start_dt, end_dt))
-        return festivals
+        return load_festivals_cached(ICS_FILE_PATH)
     except Exception as e:
         st.error(f"Error parsing local festival calendar ({ICS_FILE_PATH}): {e}")
-        return []
\ No newline at end of file
+        return []
+
+def _unescape_text(value):
+    """Undo RFC 5545 TEXT escaping."""
+    return _ICS_ESCAPE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+def _parse_ics_datetime(value):
+    """DATE (YYYYMMDD) or DATE-TIME (YYYYMMDDTHHMMSS[Z]) as a naive datetime (wall time)."""
+    value = value.strip().rstrip("Z")
+    if "T" in value:
+        return datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    return datetime.strptime(value[:8], "%Y%m%d")
+
+def _unfolded_lines(f):
+    """Yield logical content lines, joining folded continuation lines."""
+    current = None
+    for raw in f:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def parse_ics_events(path):
+    """
+    Stream VEVENTs from an ICS file, keeping only SUMMARY, DTSTART and DTEND.
+    Returns a list of (name, start_dt, end_dt) with timezone-naive datetimes.
+    """
+    festivals = []
+    in_event = False
+    summary = start = end = None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in _unfolded_lines(f):
+            if line == "BEGIN:VEVENT":
+                in_event = True
+                summary = start = end = None
+            elif line == "END:VEVENT":
+                if in_event and start is not None:
+                    # Missing DTEND means a single-day / instant event
+                    festivals.append((summary or "", start, end if end is not None else start))
+                in_event = False
+            elif in_event:
+                key, _, value = line.partition(":")
+                prop = key.split(";", 1)[0].upper()
+                if prop == "SUMMARY":
+                    summary = _unescape_text(value)
+                elif prop == "DTSTART":
+                    start = _parse_ics_datetime(value)
+                elif prop == "DTEND":
+                    end = _parse_ics_datetime(value)
+    return festivals
+
+def load_festivals_cached(path=ICS_FILE_PATH, cache_path=ICS_CACHE_PATH):
+    """
+    Parsed festivals from `path`, served from a pickle cache while the ICS
+    file's mtime and size are unchanged.
+    """
+    stat = os.stat(path)
+    key = (ICS_CACHE_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get("key") == key:
+            return cached["festivals"]
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError):
+        pass
+
+    festivals = parse_ics_events(path)
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": key, "festivals": festivals}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # cache is best-effort
+    return festivals
@@ -1,13 +1,149 @@
 import streamlit as st
 import requests
-import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Optional
 import re
+from requests.adapters import HTTPAdapter
+
+# (connect, read) seconds for identity toolkit calls
+AUTH_TIMEOUT = (5, 10)
+AUTH_POOL_SIZE = 16
+# Attempts per call; waits AUTH_BACKOFF_S * 2^(attempt-1) between them
+AUTH_MAX_ATTEMPTS = 3
+AUTH_BACKOFF_S = 0.25
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Refresh a cached ID token this many seconds before it expires
+TOKEN_REFRESH_MARGIN_S = 300
+# Refresh errors that end the session; anything else is treated as transient
+REFRESH_REJECTED_ERRORS = {"TOKEN_EXPIRED", "INVALID_REFRESH_TOKEN"}
+# Cached tokens: at most this many users, each dropped after this long without use
+TOKEN_CACHE_MAX = 1000
+TOKEN_CACHE_IDLE_S = 12 * 3600
 
 class GoaPoliceAuth:
-    def __init__(self):
-        self.api_key = st.secrets["firebase"]["web_api_key"]
-        self.base_url = "https://identitytoolkit.googleapis.com/v1/accounts"
+    """
+    Firebase identity toolkit REST client for officer accounts.
+
+    Calls share one keep-alive session, transient failures are retried with
+    exponential backoff, and each user's ID token is cached and renewed with
+    the refresh token shortly before it expires. The token cache is LRU,
+    bounded by TOKEN_CACHE_MAX users and TOKEN_CACHE_IDLE_S of idleness. Point it at a local stub with
+    `base_url` / `token_url`, or via FIREBASE_AUTH_EMULATOR_HOST.
+    """
+
+    def __init__(self, api_key=None, base_url=None, token_url=None, session=None, timeout=AUTH_TIMEOUT):
+        self.api_key = api_key or st.secrets["firebase"]["web_api_key"]
+        emulator = os.environ.get("FIREBASE_AUTH_EMULATOR_HOST")
+        prefix = f"http://{emulator}/" if emulator else "https://"
+        self.base_url = base_url or f"{prefix}identitytoolkit.googleapis.com/v1/accounts"
+        self.token_url = token_url or f"{prefix}securetoken.googleapis.com/v1/token"
+        self.timeout = timeout
+        self.session = session or self._new_session(AUTH_POOL_SIZE)
+        self._tokens = OrderedDict()
+        self._token_lock = threading.Lock()
+
+    @staticmethod
+    def _new_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _post(self, url, payload, idempotent=True, form=False, retry=True):
+        """
+        POST with retries. Non-idempotent calls (sign-up) are only retried when
+        the request cannot have been processed: connection failures, 429, 503.
+        `retry=False` sends exactly once.
+        """
+        retry_statuses = RETRY_STATUSES if idempotent else {429, 503}
+        attempts = AUTH_MAX_ATTEMPTS if retry else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                body = {"data": payload} if form else {"json": payload}
+                response = self.session.post(url, timeout=self.timeout, **body)
+                if response.status_code not in retry_statuses or attempt == attempts:
+                    return response
+            except requests.ConnectionError:
+                if attempt == attempts:
+                    raise
+            except requests.Timeout:
+                if not idempotent or attempt == attempts:
+                    raise
+            time.sleep(AUTH_BACKOFF_S * 2 ** (attempt - 1))
+
+    @staticmethod
+    def _error_message(response):
+        try:
+            return response.json().get("error", {}).get("message", "Unknown error")
+        except ValueError:
+            return f"HTTP {response.status_code}"
+
+    def _remember_token(self, user_id, id_token, refresh_token, expires_in):
+        if not (user_id and id_token):
+            return
+        now = time.time()
+        with self._token_lock:
+            self._tokens[user_id] = {
+                "id_token": id_token,
+                "refresh_token": refresh_token,
+                "expires_at": now + int(expires_in or 3600),
+                "last_used": now,
+            }
+            self._tokens.move_to_end(user_id)
+            # Least recently used first: drop idle entries, then trim to size
+            while self._tokens:
+                oldest = next(iter(self._tokens.values()))
+                if len(self._tokens) <= TOKEN_CACHE_MAX and now - oldest["last_used"] <= TOKEN_CACHE_IDLE_S:
+                    break
+                self._tokens.popitem(last=False)
+
+    def get_id_token(self, user_id: str, refresh_token: Optional[str] = None) -> Optional[str]:
+        """
+        Cached ID token for a signed-in user, renewed via the refresh token near
+        expiry. `refresh_token` (e.g. kept in the user's session) restores a
+        session the cache has lost to idleness, eviction or a restart.
+
+        Returns None only when there is nothing to refresh with or the service
+        rejects the refresh token (TOKEN_EXPIRED / INVALID_REFRESH_TOKEN).
+        Network failures and other errors raise requests.RequestException.
+        """
+        now = time.time()
+        with self._token_lock:
+            cached = self._tokens.get(user_id)
+            if cached is not None and now - cached["last_used"] > TOKEN_CACHE_IDLE_S:
+                del self._tokens[user_id]
+                cached = None
+            if cached is not None:
+                cached["last_used"] = now
+                self._tokens.move_to_end(user_id)
+        if cached is not None and cached["expires_at"] - now > TOKEN_REFRESH_MARGIN_S:
+            return cached["id_token"]
+        refresh_token = (cached or {}).get("refresh_token") or refresh_token
+        if not refresh_token:
+            return None
+
+        response = self._post(f"{self.token_url}?key={self.api_key}",
+                              {"grant_type": "refresh_token", "refresh_token": refresh_token},
+                              form=True)
+        if response.status_code != 200:
+            error_message = self._error_message(response)
+            if error_message.split(" ")[0] in REFRESH_REJECTED_ERRORS:
+                self.forget_token(user_id)
+                return None
+            raise requests.HTTPError(f"Token refresh failed: {error_message}", response=response)
+        data = response.json()
+        self._remember_token(user_id, data.get("id_token"), data.get("refresh_token"), data.get("expires_in"))
+        return data.get("id_token")
+
+    def forget_token(self, user_id: str):
+        """Drop a user's cached tokens (e.g. on logout)."""
+        with self._token_lock:
+            self._tokens.pop(user_id, None)
         
     def create_synthetic_email(self, first_name: str, last_name: str, rank: str) -> str:
         """Create a synthetic email from name and rank for Firebase Auth"""
@@ -35,10 +171,12 @@ class GoaPoliceAuth:
             "returnSecureToken": True
         }
         
-        response = requests.post(url, data=json.dumps(payload))
+        response = self._post(url, payload, idempotent=False)
         
         if response.status_code == 200:
             user_data = response.json()
+            self._remember_token(user_data.get("localId"), user_data.get("idToken"),
+                                 user_data.get("refreshToken"), user_data.get("expiresIn"))
             # Add custom fields to the response
             user_data['first_name'] = first_name
             user_data['last_name'] = last_name
@@ -48,8 +186,7 @@ class GoaPoliceAuth:
             user_data['synthetic_email'] = synthetic_email
             return {"success": True, "user": user_data}
         else:
-            error_data = response.json()
-            error_message = error_data.get("error", {}).get("message", "Unknown error")
+            error_message = self._error_message(response)
             
             # Handle duplicate username scenario
             if "EMAIL_EXISTS" in error_message:
@@ -70,14 +207,15 @@ class GoaPoliceAuth:
             "returnSecureToken": True
         }
         
-        response = requests.post(url, data=json.dumps(payload))
+        response = self._post(url, payload)
         
         if response.status_code == 200:
             user_data = response.json()
+            self._remember_token(user_data.get("localId"), user_data.get("idToken"),
+                                 user_data.get("refreshToken"), user_data.get("expiresIn"))
             return {"success": True, "user": user_data}
         else:
-            error_data = response.json()
-            error_message = error_data.get("error", {}).get("message", "Unknown error")
+            error_message = self._error_message(response)
             
             if "EMAIL_NOT_FOUND" in error_message or "INVALID_PASSWORD" in error_message:
                 return {"success": False, "error": "Invalid name, rank, or password. Please check your credentials."}
@@ -95,12 +233,28 @@ class GoaPoliceAuth:
             "email": synthetic_email
         }
         
-        response = requests.post(url, data=json.dumps(payload))
+        # Sends an email, so never repeated
+        response = self._post(url, payload, idempotent=False, retry=False)
         
         if response.status_code == 200:
             return {"success": True}
         else:
             return {"success": False, "error": "Password reset not available. Please contact administrator."}
 
-# Initialize auth instance
-goa_police_auth = GoaPoliceAuth()
+_auth = None
+_auth_lock = threading.Lock()
+
+
+def get_goa_police_auth() -> GoaPoliceAuth:
+    """The process-wide client, created on first use."""
+    global _auth
+    with _auth_lock:
+        if _auth is None:
+            _auth = GoaPoliceAuth()
+        return _auth
+
+
+def forget_token(user_id: str):
+    """Drop a user's cached tokens on logout; nothing to do if no client was ever created."""
+    if _auth is not None and user_id:
+        _auth.forget_token(user_id)
@@ -1,6 +1,5 @@
 # modules/ics_calendar_integration.py
 import streamlit as st
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
@@ -8,6 +7,11 @@ import os
 import pickle
 import json
 
+import numpy as np
+
+from modules.calendar_fetch import get_calendar_fetcher
+from modules.festival_store import FestivalStore
+
 # ICS parsing imports
 try:
     from icalendar import Calendar, Event
@@ -16,15 +20,19 @@ except ImportError:
 
 class ICSCalendarIntegration:
     def __init__(self):
-        self.festivals_cache = {}
+        self.store: Optional[FestivalStore] = None  # loaded on first query
+        self.use_fallback = False  # no source reachable: approximate festivals per year
+        self._fallback_years: Dict[int, List[Dict]] = {}
+        self._stats_cache = None  # (metadata mtime, statistics)
         self.local_ics_file = 'data/indian_festivals.ics'
         self.festivals_json_file = 'data/festivals_database.json'
+        self.festivals_store_file = 'data/festivals_store.npz'
         self.cache_metadata_file = 'data/festivals_cache_metadata.json'
         
         # Ensure data directory exists
         os.makedirs('data', exist_ok=True)
         
-    def initialize_festival_database(self, force_refresh: bool = False) -> Dict[str, Dict]:
+    def initialize_festival_database(self, force_refresh: bool = False) -> FestivalStore:
         """
         Initialize festival database from local files or fetch from Google Calendar.
         This covers 50+ years of past and future festivals.
@@ -34,8 +42,11 @@ class ICSCalendarIntegration:
             st.info("Initializing comprehensive festival database (50+ years coverage)...")
             return self._fetch_and_store_comprehensive_festivals()
         else:
-            # Load from local JSON database
-            if os.path.exists(self.festivals_json_file):
+            if self._is_fallback_database():
+                self.use_fallback = True
+                return FestivalStore.empty()
+            # Load from the local store (or the JSON export it replaced)
+            if os.path.exists(self.festivals_store_file) or os.path.exists(self.festivals_json_file):
                 return self._load_local_festival_database()
             else:
                 # First time setup
@@ -51,6 +62,8 @@ class ICSCalendarIntegration:
             with open(self.cache_metadata_file, 'r') as f:
                 metadata = json.load(f)
             
+            if metadata.get('stale'):
+                return True  # built from cached copies while the sources were down
             last_update = datetime.fromisoformat(metadata.get('last_update', '1900-01-01'))
             age_days = (datetime.now() - last_update).days
             
@@ -58,12 +71,20 @@ class ICSCalendarIntegration:
         except:
             return True
     
-    def _fetch_and_store_comprehensive_festivals(self) -> Dict[str, Dict]:
+    def _is_fallback_database(self) -> bool:
+        """Whether the last refresh fell back to approximate festivals"""
+        try:
+            with open(self.cache_metadata_file, 'r') as f:
+                return bool(json.load(f).get('fallback', False))
+        except Exception:
+            return False
+    
+    def _fetch_and_store_comprehensive_festivals(self) -> FestivalStore:
         """
         Fetch comprehensive festival data and store locally.
         This attempts to get maximum historical and future coverage.
         """
-        all_festivals = {}
+        all_festivals = FestivalStore.empty()
         
         # Multiple calendar sources for comprehensive coverage
         calendar_sources = [
@@ -81,64 +102,80 @@ class ICSCalendarIntegration:
             }
         ]
         
+        # All sources in parallel over one pooled session; unchanged feeds answer 304
+        # and are served from the fetcher's cache, failing feeds back off
+        fetcher = get_calendar_fetcher()
+        urls = {source['name']: self._calendar_url(source['id']) for source in calendar_sources}
+        results = fetcher.fetch_all(urls.values())
+        
+        # Nothing new: keep the existing database. Only a 304 proves it is current,
+        # so failed or skipped sources do not count as a refresh.
+        if (os.path.exists(self.festivals_store_file)
+                and not any(r.status == 'updated' for r in results.values())):
+            if any(r.status == 'not_modified' for r in results.values()):
+                st.info("Calendar sources unchanged since the last refresh")
+                self._touch_metadata()
+            else:
+                st.warning("No calendar source reachable; keeping the existing festival database")
+            return self._load_local_festival_database()
+        
         successful_fetches = 0
+        stale_fetches = 0
         
         for source in calendar_sources:
-            try:
-                st.info(f"Fetching from {source['name']}...")
-                festivals = self._fetch_calendar_source(source['id'])
+            result = results[urls[source['name']]]
+            stale = result.status in ('skipped', 'error')
+            if result.status == 'skipped':
+                st.warning(f"✗ Skipping {source['name']} after recent failures: {result.error}")
+            elif result.status == 'error':
+                st.warning(f"✗ Failed to fetch from {source['name']}: {result.error}")
+            if not result.ok:
+                continue
+            
+            festivals = self.parse_ics_content(result.text)
+            if festivals:
+                # Merge festivals; same-day events are all kept, only the
+                # same festival on the same day is de-duplicated
+                all_festivals = all_festivals.merged(FestivalStore.from_records(festivals))
                 
-                if festivals:
-                    # Merge festivals (avoid duplicates by date)
-                    for date_str, festival_info in festivals.items():
-                        if date_str not in all_festivals:
-                            all_festivals[date_str] = festival_info
-                        else:
-                            # If duplicate date, prefer more detailed entry
-                            existing = all_festivals[date_str]
-                            if len(festival_info.get('description', '')) > len(existing.get('description', '')):
-                                all_festivals[date_str] = festival_info
-                    
+                if stale:
+                    stale_fetches += 1
+                    st.info(f"Using the cached copy of {source['name']} ({len(festivals)} events)")
+                else:
                     successful_fetches += 1
                     st.success(f"✓ Fetched {len(festivals)} events from {source['name']}")
-                else:
-                    st.warning(f"✗ No data from {source['name']}")
-                    
-            except Exception as e:
-                st.warning(f"✗ Failed to fetch from {source['name']}: {str(e)}")
-        
-        if successful_fetches == 0:
-            st.error("Failed to fetch from any calendar source. Creating minimal fallback database.")
-            all_festivals = self._create_minimal_fallback_database()
-        
-        # Store the comprehensive database
-        self._save_festival_database(all_festivals)
-        
-        # Also save raw ICS for reference
-        if all_festivals:
+            elif not stale:
+                st.warning(f"✗ No data from {source['name']}")
+        
+        if successful_fetches == 0 and stale_fetches == 0:
+            st.error("Failed to fetch from any calendar source. Using minimal fallback festivals.")
+            st.warning("Using fallback festival database with approximate dates")
+            # Approximate festivals are generated per year when a range is queried
+            self.use_fallback = True
+            self._save_fallback_metadata()
+            return FestivalStore.empty()
+        
+        self.use_fallback = False
+        # Save raw ICS for reference, then the database (its metadata records both file sizes)
+        if len(all_festivals):
             self._save_ics_locally(all_festivals)
         
+        # Store the comprehensive database; one built only from cached copies
+        # is marked stale so the next run tries the sources again
+        self._save_festival_database(all_festivals, stale=successful_fetches == 0)
+        
         st.success(f"🎉 Festival database created with {len(all_festivals)} festivals")
         st.info(f"Coverage: {self._get_date_coverage(all_festivals)}")
         
         return all_festivals
     
-    def _fetch_calendar_source(self, calendar_id: str) -> Dict[str, Dict]:
-        """Fetch festivals from a single calendar source"""
-        try:
-            ics_url = f'https://calendar.google.com/calendar/ical/{calendar_id}/public/basic.ics'
-            
-            response = requests.get(ics_url, timeout=30)
-            response.raise_for_status()
-            
-            return self.parse_ics_content(response.text)
-            
-        except Exception as e:
-            raise Exception(f"Failed to fetch calendar {calendar_id}: {str(e)}")
+    @staticmethod
+    def _calendar_url(calendar_id: str) -> str:
+        return f'https://calendar.google.com/calendar/ical/{calendar_id}/public/basic.ics'
     
-    def parse_ics_content(self, ics_content: str) -> Dict[str, Dict]:
-        """Parse ICS content and extract all events as potential festivals"""
-        festivals = {}
+    def parse_ics_content(self, ics_content: str) -> List[Dict]:
+        """Parse ICS content and extract all events as potential festivals (several per day allowed)"""
+        festivals = []
         
         try:
             cal = Calendar.from_ical(ics_content)
@@ -160,13 +197,12 @@ class ICSCalendarIntegration:
                         
                         # Only include events that look like festivals
                         if self._is_likely_festival(summary):
-                            date_str = event_date.strftime('%Y-%m-%d')
-                            festivals[date_str] = {
+                            festivals.append({
                                 'name': summary.strip(),
                                 'date': event_date,
                                 'description': str(component.get('description', '')).strip(),
                                 'source': 'ics_import'
-                            }
+                            })
         
         except Exception as e:
             st.warning(f"Error parsing ICS content: {e}")
@@ -208,8 +244,8 @@ class ICSCalendarIntegration:
         
         return any(keyword in name_lower for keyword in festival_keywords)
     
-    def _create_minimal_fallback_database(self) -> Dict[str, Dict]:
-        """Create a minimal festival database as fallback"""
+    def _create_minimal_fallback_database(self, year: int) -> List[Dict]:
+        """Create minimal fallback festivals for one year"""
         base_festivals = {
             # Major recurring festivals with approximate dates
             'diwali': {'month': 10, 'name': 'Diwali'},
@@ -228,79 +264,138 @@ class ICSCalendarIntegration:
             'hanuman_jayanti': {'month': 4, 'name': 'Hanuman Jayanti'},
         }
         
-        fallback_festivals = {}
-        current_year = datetime.now().year
+        fallback_festivals = []
+        for fest_key, fest_info in base_festivals.items():
+            # Approximate date (15th of the month)
+            try:
+                festival_date = datetime(year, fest_info['month'], 15)
+                
+                fallback_festivals.append({
+                    'name': fest_info['name'],
+                    'date': festival_date,
+                    'description': f"Approximate date for {fest_info['name']}",
+                    'source': 'fallback'
+                })
+            except:
+                continue
         
-        # Generate festivals for 50 years (25 past + 25 future)
-        for year in range(current_year - 25, current_year + 26):
-            for fest_key, fest_info in base_festivals.items():
-                # Approximate date (15th of the month)
-                try:
-                    festival_date = datetime(year, fest_info['month'], 15)
-                    date_str = festival_date.strftime('%Y-%m-%d')
-                    
-                    fallback_festivals[date_str] = {
-                        'name': fest_info['name'],
-                        'date': festival_date,
-                        'description': f"Approximate date for {fest_info['name']}",
-                        'source': 'fallback'
-                    }
-                except:
-                    continue
-        
-        st.warning("Using fallback festival database with approximate dates")
         return fallback_festivals
     
-    def _save_festival_database(self, festivals: Dict[str, Dict]):
-        """Save festival database to JSON file"""
+    def _fallback_festivals(self, first_year: int, last_year: int) -> FestivalStore:
+        """
+        Fallback festivals for the requested years (within 25 years either side
+        of today), each year generated once and memoised.
+        """
+        current_year = datetime.now().year
+        records = []
+        for year in range(max(first_year, current_year - 25), min(last_year, current_year + 25) + 1):
+            if year not in self._fallback_years:
+                self._fallback_years[year] = self._create_minimal_fallback_database(year)
+            records.extend(self._fallback_years[year])
+        return FestivalStore.from_records(records)
+    
+    def _save_fallback_metadata(self):
+        """Record a fallback refresh; nothing else is written to disk"""
+        metadata = {
+            'last_update': datetime.now().isoformat(),
+            'total_festivals': 0,
+            'date_range': 'Approximate, generated per year on demand',
+            'sources': ['fallback'],
+            'festivals_by_year': {},
+            'file_sizes': {},
+            'fallback': True
+        }
+        try:
+            with open(self.cache_metadata_file, 'w') as f:
+                json.dump(metadata, f, indent=2)
+        except Exception as e:
+            st.warning(f"Failed to save festival metadata: {e}")
+    
+    def _save_festival_database(self, festivals: FestivalStore, stale: bool = False):
+        """Save the columnar store, plus a JSON export (list of events) for reference"""
         try:
+            festivals.save(self.festivals_store_file)
+            
             # Convert datetime objects to ISO strings for JSON serialization
-            json_festivals = {}
-            for date_str, festival_info in festivals.items():
-                json_festival = festival_info.copy()
-                json_festival['date'] = festival_info['date'].isoformat()
-                json_festivals[date_str] = json_festival
+            json_festivals = []
+            for festival_info in festivals.records():
+                festival_info['date'] = festival_info['date'].isoformat()
+                json_festivals.append(festival_info)
             
             with open(self.festivals_json_file, 'w', encoding='utf-8') as f:
                 json.dump(json_festivals, f, indent=2, ensure_ascii=False)
             
-            # Save metadata
-            metadata = {
-                'last_update': datetime.now().isoformat(),
-                'total_festivals': len(festivals),
-                'date_range': self._get_date_coverage(festivals),
-                'sources': list(set(f.get('source', 'unknown') for f in festivals.values()))
-            }
-            
-            with open(self.cache_metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self._write_metadata(festivals, stale=stale)
             
             st.success(f"✓ Saved festival database: {len(festivals)} festivals")
             
         except Exception as e:
             st.error(f"Failed to save festival database: {e}")
     
-    def _load_local_festival_database(self) -> Dict[str, Dict]:
-        """Load festival database from local JSON file"""
+    def _database_files(self) -> Dict[str, str]:
+        return {
+            'festivals_store.npz': self.festivals_store_file,
+            'festivals_database.json': self.festivals_json_file,
+            'indian_festivals.ics': self.local_ics_file,
+        }
+    
+    def _write_metadata(self, festivals: FestivalStore, last_update: Optional[str] = None, stale: bool = False):
+        """
+        Save metadata with the database statistics (per-year counts, sources,
+        coverage, file sizes), so the status widget never re-reads the database
+        """
+        metadata = {
+            'last_update': last_update or datetime.now().isoformat(),
+            'stale': stale,
+            'total_festivals': len(festivals),
+            'date_range': self._get_date_coverage(festivals),
+            'sources': festivals.source_names(),
+            'festivals_by_year': festivals.year_counts(),
+            'file_sizes': {name: os.path.getsize(path)
+                           for name, path in self._database_files().items() if os.path.exists(path)}
+        }
+        
+        with open(self.cache_metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+    
+    def _touch_metadata(self):
+        """Mark the database as refreshed without rewriting it (sources unchanged)"""
         try:
-            with open(self.festivals_json_file, 'r', encoding='utf-8') as f:
-                json_festivals = json.load(f)
-            
-            # Convert ISO strings back to datetime objects
-            festivals = {}
-            for date_str, festival_info in json_festivals.items():
-                festival_copy = festival_info.copy()
-                festival_copy['date'] = datetime.fromisoformat(festival_info['date'])
-                festivals[date_str] = festival_copy
+            with open(self.cache_metadata_file, 'r') as f:
+                metadata = json.load(f)
+        except Exception:
+            metadata = {}
+        metadata['last_update'] = datetime.now().isoformat()
+        with open(self.cache_metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+    
+    def _load_local_festival_database(self) -> FestivalStore:
+        """Load the columnar store, migrating from the JSON database if that is all there is"""
+        try:
+            if os.path.exists(self.festivals_store_file):
+                festivals = FestivalStore.load(self.festivals_store_file)
+            else:
+                with open(self.festivals_json_file, 'r', encoding='utf-8') as f:
+                    json_festivals = json.load(f)
+                
+                # Old databases are keyed by date, newer exports are a list of events
+                if isinstance(json_festivals, dict):
+                    festivals = FestivalStore.from_legacy_dict(json_festivals)
+                else:
+                    for festival_info in json_festivals:
+                        festival_info['date'] = datetime.fromisoformat(festival_info['date'])
+                    festivals = FestivalStore.from_records(json_festivals)
+                festivals.save(self.festivals_store_file)
+                self._backfill_metadata(festivals)
             
             st.success(f"✓ Loaded local festival database: {len(festivals)} festivals")
             return festivals
             
         except Exception as e:
             st.error(f"Failed to load local festival database: {e}")
-            return {}
+            return FestivalStore.empty()
     
-    def _save_ics_locally(self, festivals: Dict[str, Dict]):
+    def _save_ics_locally(self, festivals: FestivalStore):
         """Save festivals as local ICS file for reference"""
         try:
             ics_content = self._generate_ics_content(festivals)
@@ -313,8 +408,8 @@ class ICSCalendarIntegration:
         except Exception as e:
             st.warning(f"Failed to save local ICS file: {e}")
     
-    def _generate_ics_content(self, festivals: Dict[str, Dict]) -> str:
-        """Generate ICS content from festival dictionary"""
+    def _generate_ics_content(self, festivals: FestivalStore) -> str:
+        """Generate ICS content from the festival store"""
         ics_content = """BEGIN:VCALENDAR
 VERSION:2.0
 PRODID:-//Goa Police//Indian Festivals Database//EN
@@ -326,13 +421,13 @@ TIMEZONE-ID:Asia/Kolkata
 X-WR-TIMEZONE:Asia/Kolkata
 """
         
-        for date_str, festival_info in festivals.items():
+        for date_str, festival_info in festivals.keyed_records().items():
             festival_date = festival_info['date']
             festival_name = festival_info['name']
             description = festival_info.get('description', f"Indian Festival - {festival_name}")
             
             ics_content += f"""BEGIN:VEVENT
-UID:{date_str}-{festival_name.replace(' ', '-').lower()}@goapolice.local
+UID:{date_str.replace('#', '-')}-{festival_name.replace(' ', '-').lower()}@goapolice.local
 DTSTART;VALUE=DATE:{festival_date.strftime('%Y%m%d')}
 DTEND;VALUE=DATE:{festival_date.strftime('%Y%m%d')}
 DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}
@@ -346,32 +441,40 @@ END:VEVENT
         ics_content += "END:VCALENDAR"
         return ics_content
     
-    def _get_date_coverage(self, festivals: Dict[str, Dict]) -> str:
+    def _get_date_coverage(self, festivals: FestivalStore) -> str:
         """Get date range coverage of festival database"""
-        if not festivals:
+        span = festivals.year_span()
+        if span is None:
             return "No festivals"
         
-        dates = [datetime.strptime(date_str, '%Y-%m-%d') for date_str in festivals.keys()]
-        min_date = min(dates)
-        max_date = max(dates)
-        
-        years_coverage = max_date.year - min_date.year + 1
-        return f"{min_date.year}-{max_date.year} ({years_coverage} years)"
+        min_year, max_year = span
+        years_coverage = max_year - min_year + 1
+        return f"{min_year}-{max_year} ({years_coverage} years)"
+    
+    def get_festival_store(self) -> FestivalStore:
+        """The festival store, loaded on first use"""
+        if self.store is None:
+            self.store = self.initialize_festival_database()
+        return self.store
     
     def get_festivals_in_range(self, start_date: datetime, end_date: datetime) -> Dict[str, Dict]:
-        """Get festivals within specified date range from local database"""
-        # Initialize database if not already done
-        if not self.festivals_cache:
-            self.festivals_cache = self.initialize_festival_database()
-        
-        # Filter for date range
-        filtered_festivals = {}
-        for date_str, festival_info in self.festivals_cache.items():
-            festival_date = festival_info['date']
-            if start_date <= festival_date <= end_date:
-                filtered_festivals[date_str] = festival_info
-        
-        return filtered_festivals
+        """
+        Get festivals within specified date range from local database.
+        Keys are 'YYYY-MM-DD', with '#2', '#3', ... for further events on the same day.
+        """
+        store = self._store_for_range(start_date, end_date)
+        lo, hi = store.range_slice(start_date, end_date)
+        return store.keyed_records(lo, hi)
+    
+    def get_festival_arrays_in_range(self, start_date: datetime, end_date: datetime) -> Dict[str, np.ndarray]:
+        """Day ordinals and name / source ids of festivals in range, without building dicts"""
+        return self._store_for_range(start_date, end_date).arrays_in_range(start_date, end_date)
+    
+    def _store_for_range(self, start_date: datetime, end_date: datetime) -> FestivalStore:
+        store = self.get_festival_store()
+        if self.use_fallback:
+            return self._fallback_festivals(start_date.year, end_date.year)
+        return store
     
     def filter_festivals_by_crime_impact(self, festivals: Dict, call_data: pd.DataFrame, 
                                        impact_threshold: float = 1.3,
@@ -583,66 +686,84 @@ END:VEVENT
         
         return selected_dates
     
+    def _backfill_metadata(self, festivals: FestivalStore):
+        """Add statistics to metadata written before they were stored there (keeps last_update)"""
+        try:
+            with open(self.cache_metadata_file, 'r') as f:
+                metadata = json.load(f)
+        except Exception:
+            metadata = {}
+        try:
+            self._write_metadata(festivals, last_update=metadata.get('last_update'),
+                                 stale=bool(metadata.get('stale', False)))
+        except Exception as e:
+            st.warning(f"Failed to update festival metadata: {e}")
+    
     def get_database_statistics(self) -> Dict:
-        """Get comprehensive database statistics"""
+        """
+        Get comprehensive database statistics from the metadata written with the
+        database. Cached on the metadata file's mtime, so repeated calls cost one stat.
+        """
+        try:
+            metadata_stat = os.stat(self.cache_metadata_file)
+            mtime = metadata_stat.st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._stats_cache is not None and self._stats_cache[0] == mtime:
+            return self._stats_cache[1]
+        
         stats = {
             'database_exists': False,
             'total_festivals': 0,
             'date_coverage': 'Unknown',
             'last_update': 'Never',
-            'file_sizes': {},
+            'file_sizes': {name: "Missing" for name in
+                           list(self._database_files()) + ['festivals_cache_metadata.json']},
             'sources': [],
             'festivals_by_year': {},
             'status': 'Not initialized'
         }
         
         try:
-            # Check if database files exist
-            files_to_check = {
-                'festivals_database.json': self.festivals_json_file,
-                'indian_festivals.ics': self.local_ics_file,
-                'festivals_cache_metadata.json': self.cache_metadata_file
-            }
-            
-            for name, path in files_to_check.items():
-                if os.path.exists(path):
-                    stats['file_sizes'][name] = f"{os.path.getsize(path) / 1024:.1f} KB"
-                else:
-                    stats['file_sizes'][name] = "Missing"
-            
-            # Load metadata if available
-            if os.path.exists(self.cache_metadata_file):
+            if mtime is None:
+                stats['status'] = 'Database not found'
+            else:
                 with open(self.cache_metadata_file, 'r') as f:
                     metadata = json.load(f)
                 
+                # Metadata from before statistics were stored: fill it in once
+                if 'festivals_by_year' not in metadata and os.path.exists(self.festivals_store_file):
+                    self._backfill_metadata(FestivalStore.load(self.festivals_store_file))
+                    metadata_stat = os.stat(self.cache_metadata_file)
+                    mtime = metadata_stat.st_mtime_ns
+                    with open(self.cache_metadata_file, 'r') as f:
+                        metadata = json.load(f)
+                
+                for name, size in metadata.get('file_sizes', {}).items():
+                    stats['file_sizes'][name] = f"{size / 1024:.1f} KB"
+                stats['file_sizes']['festivals_cache_metadata.json'] = f"{metadata_stat.st_size / 1024:.1f} KB"
+                
                 stats.update({
                     'total_festivals': metadata.get('total_festivals', 0),
                     'date_coverage': metadata.get('date_range', 'Unknown'),
                     'last_update': metadata.get('last_update', 'Unknown')[:19],  # Remove microseconds
-                    'sources': metadata.get('sources', [])
+                    'sources': metadata.get('sources', []),
+                    'festivals_by_year': metadata.get('festivals_by_year', {}),
                 })
-            
-            # Load festival database for detailed stats
-            if os.path.exists(self.festivals_json_file):
-                stats['database_exists'] = True
                 
-                with open(self.festivals_json_file, 'r', encoding='utf-8') as f:
-                    festivals_data = json.load(f)
-                
-                # Count festivals by year
-                year_counts = {}
-                for date_str, festival_info in festivals_data.items():
-                    year = date_str[:4]
-                    year_counts[year] = year_counts.get(year, 0) + 1
-                
-                stats['festivals_by_year'] = dict(sorted(year_counts.items()))
-                stats['status'] = 'Ready'
-            else:
-                stats['status'] = 'Database not found'
+                if metadata.get('fallback'):
+                    stats['database_exists'] = True
+                    stats['status'] = 'Ready (approximate fallback)'
+                elif 'festivals_by_year' in metadata:
+                    stats['database_exists'] = True
+                    stats['status'] = 'Ready'
+                else:
+                    stats['status'] = 'Database not found'
                 
         except Exception as e:
             stats['status'] = f'Error: {str(e)}'
         
+        self._stats_cache = (mtime, stats)
         return stats
     
     def show_database_status_widget(self):
@@ -677,8 +798,9 @@ END:VEVENT
     def force_refresh_database(self):
         """Force refresh the festival database"""
         st.info("Force refreshing festival database...")
-        self.festivals_cache = {}
-        return self.initialize_festival_database(force_refresh=True)
+        self._fallback_years = {}
+        self.store = self.initialize_festival_database(force_refresh=True)
+        return self.store
 
 def initialize_ics_calendar_integration():
     """Initialize ICS calendar integration"""
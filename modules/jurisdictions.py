@@ -0,0 +1,205 @@
+# modules/jurisdictions.py
+# Assign / validate call jurisdictions from local boundary polygons (GeoJSON).
+# Boundaries are not shipped with the repo: export the jurisdiction and police-station
+# limits (e.g. from the district GIS cell or OpenStreetMap admin boundaries) as GeoJSON
+# FeatureCollections to the paths below, with the name in one of NAME_PROPERTIES.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+JURISDICTION_BOUNDARIES_PATH = os.path.join("data", "jurisdictions.geojson")
+POLICE_STATION_BOUNDARIES_PATH = os.path.join("data", "police_stations.geojson")
+
+# Feature properties tried, in order, for the polygon's name
+NAME_PROPERTIES = ["jurisdiction", "police_station", "name", "NAME"]
+
+UNASSIGNED = "Unassigned"
+
+
+def _feature_name(properties, name_property=None):
+    keys = [name_property] if name_property else NAME_PROPERTIES
+    for key in keys:
+        if properties.get(key):
+            return str(properties[key]).strip()
+    return None
+
+
+def _polygon_rings(geometry):
+    """All rings (outer and holes) of a Polygon / MultiPolygon as (lon, lat) arrays."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon]
+
+
+class PreparedPolygon:
+    """
+    A boundary prepared for vectorised even-odd ray casting.
+
+    Edges are stored as flat arrays with their y-band, and the bounding box is
+    kept so only candidate points are tested.
+    """
+
+    def __init__(self, name, rings):
+        self.name = name
+        x1, y1, x2, y2 = [], [], [], []
+        for ring in rings:
+            if len(ring) < 3:
+                continue
+            closed = ring if np.array_equal(ring[0], ring[-1]) else np.vstack([ring, ring[:1]])
+            x1.append(closed[:-1, 0]); y1.append(closed[:-1, 1])
+            x2.append(closed[1:, 0]); y2.append(closed[1:, 1])
+        x1, y1, x2, y2 = (np.concatenate(a) if a else np.empty(0) for a in (x1, y1, x2, y2))
+
+        # Horizontal edges never cross a horizontal ray
+        keep = y1 != y2
+        self.x1, self.y1, self.x2, self.y2 = x1[keep], y1[keep], x2[keep], y2[keep]
+        self.y_lo = np.minimum(self.y1, self.y2)
+        self.y_hi = np.maximum(self.y1, self.y2)
+        self.slope = (self.x2 - self.x1) / (self.y2 - self.y1)
+
+        all_x = np.concatenate([x1, x2]) if len(x1) else np.zeros(1)
+        all_y = np.concatenate([y1, y2]) if len(y1) else np.zeros(1)
+        self.bbox = (all_x.min(), all_y.min(), all_x.max(), all_y.max())
+
+    def contains(self, lon, lat):
+        """Boolean mask of points inside the polygon (holes excluded)."""
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        inside = np.zeros(len(lon), dtype=bool)
+        xmin, ymin, xmax, ymax = self.bbox
+        cand = np.flatnonzero((lon >= xmin) & (lon <= xmax) & (lat >= ymin) & (lat <= ymax))
+        if len(cand) == 0 or len(self.x1) == 0:
+            return inside
+
+        # Sort candidates by latitude so each edge only touches its own y-band
+        order = np.argsort(lat[cand], kind="stable")
+        cand = cand[order]
+        py, px = lat[cand], lon[cand]
+        flags = np.zeros(len(cand), dtype=bool)
+        starts = np.searchsorted(py, self.y_lo, side="left")
+        ends = np.searchsorted(py, self.y_hi, side="left")
+        for i in np.flatnonzero(ends > starts):
+            s, e = starts[i], ends[i]
+            x_cross = self.x1[i] + (py[s:e] - self.y1[i]) * self.slope[i]
+            flags[s:e] ^= px[s:e] < x_cross
+
+        inside[cand] = flags
+        return inside
+
+
+class BoundarySet:
+    """Named boundary polygons with a coarse bounding-box index."""
+
+    def __init__(self, polygons):
+        self.polygons = polygons
+        self.names = [p.name for p in polygons]
+        self.bboxes = np.array([p.bbox for p in polygons], dtype=np.float64).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def assign(self, lat, lon):
+        """Name of the polygon containing each point, or UNASSIGNED."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        codes = np.full(len(lat), -1, dtype=np.int32)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        if len(self.polygons) == 0 or not valid.any():
+            return np.full(len(lat), UNASSIGNED, dtype=object)
+
+        # Skip polygons whose bounding box holds none of the points
+        vlat, vlon = lat[valid], lon[valid]
+        lo_lat, hi_lat, lo_lon, hi_lon = vlat.min(), vlat.max(), vlon.min(), vlon.max()
+        for code, polygon in enumerate(self.polygons):
+            xmin, ymin, xmax, ymax = self.bboxes[code]
+            if xmax < lo_lon or xmin > hi_lon or ymax < lo_lat or ymin > hi_lat:
+                continue
+            todo = np.flatnonzero(valid & (codes < 0))
+            if len(todo) == 0:
+                break
+            hit = polygon.contains(lon[todo], lat[todo])
+            codes[todo[hit]] = code
+
+        lookup = np.array(self.names + [UNASSIGNED], dtype=object)
+        return lookup[codes]
+
+
+def load_boundaries(path=JURISDICTION_BOUNDARIES_PATH, name_property=None):
+    """Load a GeoJSON FeatureCollection of Polygon/MultiPolygon features, or None if missing."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+
+    polygons = []
+    for feature in collection.get("features", []):
+        name = _feature_name(feature.get("properties") or {}, name_property)
+        geometry = feature.get("geometry")
+        if not name or not geometry:
+            continue
+        rings = _polygon_rings(geometry)
+        if rings:
+            polygons.append(PreparedPolygon(name, rings))
+    return BoundarySet(polygons)
+
+
+@st.cache_resource(show_spinner=False)
+def _load_boundaries_cached(path, name_property, mtime):
+    return load_boundaries(path, name_property)
+
+
+def get_boundaries(path=JURISDICTION_BOUNDARIES_PATH, name_property=None):
+    """Cached boundaries; reloaded when the GeoJSON file changes."""
+    if not os.path.exists(path):
+        return None
+    return _load_boundaries_cached(path, name_property, os.path.getmtime(path))
+
+
+def validate_jurisdictions(df, boundaries, lat_col="caller_lat", lon_col="caller_lon",
+                           jurisdiction_col="jurisdiction", station_boundaries=None):
+    """
+    Add `jurisdiction_geo` (from coordinates) and `jurisdiction_mismatch`
+    (uploaded value disagrees with a polygon hit) to a copy of df, plus
+    `police_station_geo` when station boundaries are given. Either boundary
+    set may be None.
+    """
+    df = df.copy()
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    if station_boundaries is not None:
+        df["police_station_geo"] = station_boundaries.assign(lat, lon)
+    if boundaries is None:
+        return df
+    df["jurisdiction_geo"] = boundaries.assign(lat, lon)
+
+    uploaded = df[jurisdiction_col].astype(str).str.strip().str.lower()
+    derived = df["jurisdiction_geo"].astype(str).str.lower()
+    df["jurisdiction_mismatch"] = (df["jurisdiction_geo"] != UNASSIGNED) & (uploaded != derived)
+    return df
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@st.cache_data(show_spinner=False)
+def _validate_jurisdictions_cached(df, path, mtime, station_path, station_mtime):
+    return validate_jurisdictions(df, get_boundaries(path), station_boundaries=get_boundaries(station_path))
+
+
+def check_jurisdictions(df, path=JURISDICTION_BOUNDARIES_PATH, station_path=POLICE_STATION_BOUNDARIES_PATH):
+    """
+    validate_jurisdictions() memoised per dataset and boundary-file versions.
+    Returns df unchanged when neither boundary file is available.
+    """
+    mtime, station_mtime = _mtime(path), _mtime(station_path)
+    if df.empty or (mtime is None and station_mtime is None):
+        return df
+    return _validate_jurisdictions_cached(df, path, mtime, station_path, station_mtime)
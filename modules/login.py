@@ -1,24 +1,165 @@
 # modules/login.py
+# Username/password check against data/users.xlsx, indexed in memory and reloaded when the file changes.
+# Passwords are stored as salted PBKDF2 hashes; plaintext cells are hashed on load.
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+
 import pandas as pd
 
-def check_credentials(username, password, filepath="data/users.xlsx"):
+USERS_FILE = "data/users.xlsx"
+
+# Stored hashes look like pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>
+HASH_SCHEME = "pbkdf2_sha256"
+HASH_ITERATIONS = 200_000
+
+
+def hash_password(password, salt=None, iterations=HASH_ITERATIONS):
+    """Salted PBKDF2 hash of `password` in the stored format."""
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", str(password).encode(), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, stored):
+    """Check `password` against a hash_password() string."""
     try:
-        df = pd.read_excel(filepath)
-        # Normalize column names
-        df.columns = df.columns.str.strip().str.lower()
+        scheme, iterations, salt, digest = stored.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if scheme != HASH_SCHEME:
+        return False
+    candidate = hashlib.pbkdf2_hmac("sha256", str(password).encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(candidate.hex(), digest)
 
-        # Normalize values
-        df['username'] = df['username'].astype(str).str.strip().str.lower()
-        df['password'] = df['password'].astype(str).str.strip()
 
-        username = str(username).strip().lower()
-        password = str(password).strip()
+def _clean(value):
+    return "" if pd.isna(value) else str(value).strip()
 
-        user = df[(df['username'] == username) & (df['password'] == password)]
 
-        if not user.empty:
-            return user.iloc[0].to_dict()
-        return None
+def _read_users(filepath):
+    df = pd.read_excel(filepath, dtype=object)
+    df.columns = df.columns.str.strip().str.lower()
+    return df
+
+
+def _hash_plaintext(df):
+    """
+    Replace non-empty plaintext `password` cells with `password_hash` in place
+    and drop the plaintext column. Blank passwords are left unset, so those
+    rows stay unable to log in. Returns the number of rows hashed.
+    """
+    if "password" not in df.columns:
+        return 0
+    if "password_hash" not in df.columns:
+        df["password_hash"] = None
+    plaintext = df["password"].map(_clean)
+    pending = (plaintext != "") & (df["password_hash"].map(_clean) == "")
+    df.loc[pending, "password_hash"] = plaintext[pending].map(hash_password)
+    df.drop(columns=["password"], inplace=True)
+    return int(pending.sum())
+
+
+def _write_users(df, filepath):
+    """Write the workbook to a temporary file beside it, then swap it in."""
+    fd, tmp = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(filepath) or ".")
+    os.close(fd)
+    try:
+        df.to_excel(tmp, index=False)
+        os.replace(tmp, filepath)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+class UserStore:
+    """
+    Users keyed on lower-cased username, each with a salted `password_hash`
+    (see hash_password). Plaintext `password` cells found on load are hashed
+    and written back to the workbook, so they are never compared directly.
+    The workbook is re-read only when its mtime changes.
+    """
+
+    def __init__(self, filepath=USERS_FILE):
+        self.filepath = filepath
+        self._mtime = None
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.filepath).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            if mtime is None:
+                self._users = {}
+            else:
+                self._users, mtime = self._load()
+            self._mtime = mtime
+
+    def _load(self):
+        df = _read_users(self.filepath)
+        if _hash_plaintext(df):
+            try:
+                _write_users(df, self.filepath)
+            except OSError as e:
+                # The hashes still apply in memory; the migration is retried on the next reload
+                print("Could not write hashed passwords to users file:", e)
+        mtime = os.stat(self.filepath).st_mtime_ns
+        users = {}
+        for row in df.to_dict("records"):
+            username = _clean(row.get("username")).lower()
+            stored = _clean(row.pop("password_hash", ""))
+            if not username or not stored or username in users:
+                continue
+            row["username"] = username
+            users[username] = (stored, row)
+        return users, mtime
+
+    def authenticate(self, username, password):
+        """The user's row (without password fields) if the credentials match, else None."""
+        self._refresh()
+        entry = self._users.get(str(username).strip().lower())
+        if entry is None:
+            return None
+        stored, row = entry
+        return dict(row) if verify_password(str(password).strip(), stored) else None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_user_store(filepath=USERS_FILE):
+    """One UserStore per workbook path for the life of the process."""
+    with _stores_lock:
+        if filepath not in _stores:
+            _stores[filepath] = UserStore(filepath)
+        return _stores[filepath]
+
+
+def check_credentials(username, password, filepath=USERS_FILE):
+    try:
+        return get_user_store(filepath).authenticate(username, password)
     except Exception as e:
         print("Error reading users file:", e)
         return None
+
+
+def migrate_passwords(filepath=USERS_FILE):
+    """
+    Hash any plaintext passwords in the workbook now rather than on the next
+    login (the user store does the same on load); returns rows migrated.
+    """
+    df = _read_users(filepath)
+    migrated = _hash_plaintext(df)
+    if migrated:
+        _write_users(df, filepath)
+    return migrated
@@ -1,8 +1,36 @@
 # modules/mapping.py
 # Placeholder mapping functions for Sprint-1.
 # In Sprint-2 we'll replace / extend these to return Folium maps or GeoJSON.
+import numpy as np
 import pydeck as pdk
 import pandas as pd
+import streamlit as st
+from config import GOA_BOUNDS
+from modules.animation import frame_cells
+from modules.density import get_kde_raster
+
+# Colours shared by the category-aware layers (RGBA)
+CATEGORY_COLORS = {
+    'crime': [255, 50, 50, 200],      # Red
+    'medical': [50, 255, 50, 200],    # Green
+    'accident': [255, 255, 50, 200],  # Yellow
+    'women_safety': [255, 50, 255, 200], # Magenta
+    'other': [50, 150, 255, 200]      # Blue
+}
+DEFAULT_CATEGORY_COLOR = [255, 140, 0, 180]  # Orange
+# Single colour of the points map unless it is coloured by category
+POINT_COLOR = [0, 100, 255, 160]
+
+HEATMAP_COLOR_RANGE = [
+    [0, 0, 255, 25],    # blue
+    [0, 255, 255, 85],  # cyan
+    [0, 255, 0, 170],   # green
+    [255, 255, 0, 200], # yellow
+    [255, 0, 0, 255],   # red
+]
+
+# Decimal places kept when columnar positions are written to the client (~1 m)
+COLUMNAR_COORD_DECIMALS = 5
 
 def create_point_geojson(df, lat_col="caller_lat", lon_col="caller_lon", properties=None):
     """
@@ -43,56 +71,113 @@ def clean_df_for_pydeck(df, lat_col="caller_lat", lon_col="caller_lon"):
     df["category"] = df["category"].astype(str)
     df["jurisdiction"] = df["jurisdiction"].astype(str)
 
-    df["weight"] = 1.0  # for heatmap intensity
-
     return df
 
-def pydeck_points_map(df, lat_col="caller_lat", lon_col="caller_lon"):
-    df = clean_df_for_pydeck(df, lat_col, lon_col)
-    if df.empty:
+def to_columnar(df, lat_col="caller_lat", lon_col="caller_lon"):
+    """
+    Convert calls into typed column buffers for the map layers.
+
+    Returns a dict with Float32 `positions` (N x 2, lon/lat), Uint8
+    `category_codes` / `jurisdiction_codes` and the lookup tables
+    `categories` / `jurisdictions` that decode them.
+    """
+    cols = [c for c in (lat_col, lon_col, "category", "jurisdiction") if c in df.columns]
+    df = df[cols]
+    lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+
+    positions = np.empty((int(valid.sum()), 2), dtype=np.float32)
+    positions[:, 0] = lon[valid]
+    positions[:, 1] = lat[valid]
+
+    columns = {"positions": positions}
+    for field, table in (("category", "categories"), ("jurisdiction", "jurisdictions")):
+        if field in df.columns:
+            values = df[field][valid].astype(str)
+        else:
+            values = pd.Series("unknown", index=df.index[valid])
+        codes, uniques = pd.factorize(values, sort=True)
+        if len(uniques) > 255:
+            raise ValueError(f"Too many distinct {field} values for Uint8 codes: {len(uniques)}")
+        columns[f"{field}_codes"] = codes.astype(np.uint8)
+        columns[table] = [str(u) for u in uniques]
+    return columns
+
+def columnar_positions(columns, mask=None):
+    """Compact [lon, lat] rows for a layer using `get_position="-"`."""
+    positions = columns["positions"]
+    if mask is not None:
+        positions = positions[mask]
+    return np.round(positions.astype(np.float64), COLUMNAR_COORD_DECIMALS).tolist()
+
+def _columnar_view_state(columns, **kwargs):
+    center_lon, center_lat = columns["positions"].astype(np.float64).mean(axis=0)
+    return pdk.ViewState(latitude=float(center_lat), longitude=float(center_lon), **kwargs)
+
+def columnar_point_rows(columns, mask=None):
+    """
+    Compact point rows for pickable layers: rounded [lon, lat] under `p` and
+    the decoded category / jurisdiction under `c` / `j` for the tooltip.
+    """
+    codes = {field: columns[f"{field}_codes"] if mask is None else columns[f"{field}_codes"][mask]
+             for field in ("category", "jurisdiction")}
+    categories = np.asarray(columns["categories"], dtype=object)[codes["category"]]
+    jurisdictions = np.asarray(columns["jurisdictions"], dtype=object)[codes["jurisdiction"]]
+    return [{"p": p, "c": c, "j": j}
+            for p, c, j in zip(columnar_positions(columns, mask), categories, jurisdictions)]
+
+def pydeck_points_map_columnar(columns, color_by_category=False):
+    """
+    Scatterplot fed from columnar buffers. Looks and picks like
+    pydeck_points_map: one colour unless `color_by_category`, which
+    gives one layer per category code.
+    """
+    if len(columns["positions"]) == 0:
         return None
 
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=df,
-        get_position=[lon_col, lat_col],
-        get_color=[0, 100, 255, 160],
-        get_radius=80,
-        pickable=True,
-    )
+    if color_by_category:
+        groups = [(f"points-{category}", columns["category_codes"] == code,
+                   CATEGORY_COLORS.get(category, DEFAULT_CATEGORY_COLOR))
+                  for code, category in enumerate(columns["categories"])]
+    else:
+        groups = [("points", None, POINT_COLOR)]
 
-    view_state = pdk.ViewState(
-        latitude=df[lat_col].mean(),
-        longitude=df[lon_col].mean(),
-        zoom=9,
-        pitch=0,
-    )
+    layers = []
+    for layer_id, mask, color in groups:
+        if mask is not None and not mask.any():
+            continue
+        layers.append(pdk.Layer(
+            "ScatterplotLayer",
+            id=layer_id,
+            data=columnar_point_rows(columns, mask),
+            get_position="p",
+            get_color=color,
+            get_radius=80,
+            pickable=True,
+        ))
 
-    return pdk.Deck(layers=[layer], initial_view_state=view_state,
-                    tooltip={"text": "{category}, {jurisdiction}"})
+    view_state = _columnar_view_state(columns, zoom=9, pitch=0)
+    return pdk.Deck(layers=layers, initial_view_state=view_state, tooltip={"text": "{c}, {j}"})
+
+def pydeck_points_map(df, lat_col="caller_lat", lon_col="caller_lon", columnar=False, color_by_category=False):
+    if columnar:
+        return pydeck_points_map_columnar(to_columnar(df, lat_col, lon_col), color_by_category)
 
-def pydeck_heatmap(df, lat_col="caller_lat", lon_col="caller_lon"):
     df = clean_df_for_pydeck(df, lat_col, lon_col)
     if df.empty:
         return None
 
-    COLOR_RANGE = [
-        [0, 0, 255, 25],    # blue
-        [0, 255, 255, 85],  # cyan
-        [0, 255, 0, 170],   # green
-        [255, 255, 0, 200], # yellow
-        [255, 0, 0, 255],   # red
-    ]
+    if color_by_category:
+        df["color"] = [CATEGORY_COLORS.get(c, DEFAULT_CATEGORY_COLOR) for c in df["category"]]
 
     layer = pdk.Layer(
-        "HeatmapLayer",
+        "ScatterplotLayer",
         data=df,
         get_position=[lon_col, lat_col],
-        get_weight="weight",
-        radiusPixels=40,   # reduce radius so clusters form
-        intensity=2,
-        threshold=0.05,     # filter very low density
-        color_range = COLOR_RANGE
+        get_color="color" if color_by_category else POINT_COLOR,
+        get_radius=80,
+        pickable=True,
     )
 
     view_state = pdk.ViewState(
@@ -102,10 +187,13 @@ def pydeck_heatmap(df, lat_col="caller_lat", lon_col="caller_lon"):
         pitch=0,
     )
 
-    return pdk.Deck(layers=[layer], initial_view_state=view_state)
+    return pdk.Deck(layers=[layer], initial_view_state=view_state,
+                    tooltip={"text": "{category}, {jurisdiction}"})
 
-def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_category=False):
+def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_category=False, columnar=False):
     """Create 3D hexagonal hotspot visualization using PyDeck HexagonLayer."""
+    if columnar:
+        return pydeck_hexbin_map_columnar(to_columnar(df, lat_col, lon_col), color_by_category)
     
     # Clean and prepare data
     df_clean = df.copy()
@@ -125,17 +213,11 @@ def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_c
         return None
     
     # Filter for realistic Goa coordinates (approximate bounds)
-    # Goa latitude: ~14.9-15.8, longitude: ~73.7-74.3
-    goa_bounds = {
-        'lat_min': 14.5, 'lat_max': 16.0,
-        'lon_min': 73.0, 'lon_max': 75.0
-    }
-    
     df_clean = df_clean[
-        (df_clean[lat_col] >= goa_bounds['lat_min']) & 
-        (df_clean[lat_col] <= goa_bounds['lat_max']) &
-        (df_clean[lon_col] >= goa_bounds['lon_min']) & 
-        (df_clean[lon_col] <= goa_bounds['lon_max'])
+        (df_clean[lat_col] >= GOA_BOUNDS['lat_min']) & 
+        (df_clean[lat_col] <= GOA_BOUNDS['lat_max']) &
+        (df_clean[lon_col] >= GOA_BOUNDS['lon_min']) & 
+        (df_clean[lon_col] <= GOA_BOUNDS['lon_max'])
     ]
     
     if df_clean.empty:
@@ -164,18 +246,6 @@ def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_c
         }
         clean_data.append(record)
     
-    # Create category color mapping for potential future use
-    category_colors = {
-        'crime': [255, 50, 50, 200],      # Red
-        'medical': [50, 255, 50, 200],    # Green  
-        'accident': [255, 255, 50, 200],  # Yellow
-        'women_safety': [255, 50, 255, 200], # Magenta
-        'other': [50, 150, 255, 200]      # Blue
-    }
-    
-    # Default color for hexagons
-    default_color = [255, 140, 0, 180]  # Orange
-    
     # Calculate center point for view (using original df_clean before conversion)
     center_lat = float(pd.to_numeric(df[lat_col], errors='coerce').mean())
     center_lon = float(pd.to_numeric(df[lon_col], errors='coerce').mean())
@@ -193,7 +263,7 @@ def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_c
                 continue
                 
             # Get color for this category
-            color = list(category_colors.get(category, default_color))
+            color = list(CATEGORY_COLORS.get(category, DEFAULT_CATEGORY_COLOR))
             
             # Create layer for this category
             cat_layer = pdk.Layer(
@@ -283,4 +353,164 @@ def pydeck_hexbin_map(df, lat_col="caller_lat", lon_col="caller_lon", color_by_c
     print(f"Created hexbin map with {len(clean_data)} data points")
     print(f"Center: {center_lat:.4f}, {center_lon:.4f}")
     
-    return deck
\ No newline at end of file
+    return deck
+
+def pydeck_hexbin_map_columnar(columns, color_by_category=False):
+    """Hexbin hotspots fed from columnar buffers, clipped to the Goa bounds."""
+    positions = columns["positions"]
+    if len(positions) == 0:
+        return None
+
+    in_goa = (
+        (positions[:, 1] >= GOA_BOUNDS['lat_min']) & (positions[:, 1] <= GOA_BOUNDS['lat_max']) &
+        (positions[:, 0] >= GOA_BOUNDS['lon_min']) & (positions[:, 0] <= GOA_BOUNDS['lon_max'])
+    )
+    if not in_goa.any():
+        return None
+
+    if color_by_category:
+        deck_layers = []
+        for code, category in enumerate(columns["categories"]):
+            mask = in_goa & (columns["category_codes"] == code)
+            if not mask.any():
+                continue
+            color = CATEGORY_COLORS.get(category, DEFAULT_CATEGORY_COLOR)
+            deck_layers.append(pdk.Layer(
+                'HexagonLayer',
+                id=f"hexbin-{category}",
+                data=columnar_positions(columns, mask),
+                get_position='-',
+                radius=400,
+                elevation_scale=80,
+                elevation_range=[0, 800],
+                extruded=True,
+                coverage=0.8,
+                color_range=[
+                    [color[0], color[1], color[2], 100],
+                    [color[0], color[1], color[2], 150],
+                    [color[0], color[1], color[2], 200],
+                ],
+                pickable=True,
+                auto_highlight=True
+            ))
+    else:
+        deck_layers = [pdk.Layer(
+            'HexagonLayer',
+            data=columnar_positions(columns, in_goa),
+            get_position='-',
+            radius=500,
+            elevation_scale=100,
+            elevation_range=[0, 1000],
+            extruded=True,
+            coverage=0.9,
+            color_range=[
+                [255, 255, 204, 100],
+                [255, 237, 160, 120],
+                [254, 217, 118, 140],
+                [254, 178, 76, 160],
+                [253, 141, 60, 180],
+                [240, 59, 32, 200],
+            ],
+            pickable=True,
+            auto_highlight=True
+        )]
+
+    view_state = _columnar_view_state(
+        columns, zoom=10, min_zoom=8, max_zoom=15, pitch=45, bearing=0, height=600, width=800
+    )
+    return pdk.Deck(
+        layers=deck_layers,
+        initial_view_state=view_state,
+        tooltip={"html": "<b>Call Density Hotspot</b><br/><b>Calls:</b> {elevationValue}"},
+        map_style='mapbox://styles/mapbox/light-v9'
+    )
+
+def pydeck_density_map(raster):
+    """Precomputed KDE raster drawn as a single bitmap over the Goa bounding box."""
+    if raster is None or raster["n_calls"] == 0:
+        return None
+
+    layer = pdk.Layer(
+        "BitmapLayer",
+        image=raster["image"],
+        bounds=raster["bounds"],
+        opacity=0.85,
+    )
+
+    lon_min, lat_min, lon_max, lat_max = raster["bounds"]
+    view_state = pdk.ViewState(
+        latitude=(lat_min + lat_max) / 2.0,
+        longitude=(lon_min + lon_max) / 2.0,
+        zoom=9,
+        pitch=0,
+    )
+    return pdk.Deck(layers=[layer], initial_view_state=view_state)
+
+def pydeck_frame_map(frames, index):
+    """
+    One replay frame as 3D columns. Elevation and colour use the max cell count
+    over all frames, so hotspots are comparable while stepping through time.
+    """
+    lon, lat, count = frame_cells(frames, index)
+    scale = max(frames["max_count"], 1)
+    ramp = np.asarray([c for c in HEATMAP_COLOR_RANGE], dtype=np.float64)
+    level = np.clip(count / scale, 0.0, 1.0) * (len(ramp) - 1)
+    lo = np.floor(level).astype(int)
+    hi = np.minimum(lo + 1, len(ramp) - 1)
+    colors = ramp[lo] + (ramp[hi] - ramp[lo]) * (level - lo)[:, None]
+    colors[:, 3] = np.maximum(colors[:, 3], 120)
+
+    data = [
+        {"p": [round(float(x), 5), round(float(y), 5)], "n": int(n), "c": [int(v) for v in color]}
+        for x, y, n, color in zip(lon, lat, count, colors.round())
+    ]
+    layer = pdk.Layer(
+        "ColumnLayer",
+        data=data,
+        get_position="p",
+        get_elevation="n",
+        get_fill_color="c",
+        elevation_scale=1000.0 / scale,
+        radius=frames["cell_deg"] * 111320 / 2,
+        extruded=True,
+        pickable=True,
+    )
+
+    view_state = pdk.ViewState(
+        latitude=(GOA_BOUNDS['lat_min'] + GOA_BOUNDS['lat_max']) / 2.0,
+        longitude=(GOA_BOUNDS['lon_min'] + GOA_BOUNDS['lon_max']) / 2.0,
+        zoom=9,
+        pitch=45,
+    )
+    return pdk.Deck(layers=[layer], initial_view_state=view_state,
+                    tooltip={"text": "{n} calls"})
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_map_columns(filter_key, _df, lat_col="caller_lat", lon_col="caller_lon"):
+    """Typed coordinate buffers for the filtered calls, shared by the columnar map kinds."""
+    return to_columnar(_df, lat_col, lon_col)
+
+@st.cache_resource(max_entries=12, show_spinner=False)
+def get_map_deck(kind, filter_key, _df, columnar=False, color_by_category=False):
+    """
+    Build one deck ('points', 'density' or 'hexbin') for the filtered calls.
+    Memoised on `filter_key`, so reruns that keep the filters reuse the deck.
+    """
+    if kind == "density":
+        return pydeck_density_map(get_kde_raster(filter_key, _df))
+    columns = None
+    if columnar:
+        try:
+            columns = get_map_columns(filter_key, _df)
+        except ValueError:
+            # More than 255 categories / jurisdictions: Uint8 codes can't hold them, use record layers
+            columns = None
+    if kind == "points":
+        if columns is not None:
+            return pydeck_points_map_columnar(columns, color_by_category)
+        return pydeck_points_map(_df, color_by_category=color_by_category)
+    if kind == "hexbin":
+        if columns is not None:
+            return pydeck_hexbin_map_columnar(columns, color_by_category)
+        return pydeck_hexbin_map(_df, color_by_category=color_by_category)
+    raise ValueError(f"Unknown map kind: {kind}")
@@ -0,0 +1,223 @@
+# modules/response_sim.py
+# Monte Carlo what-if simulation of response times for a jurisdiction's unit pool.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from modules.allocation_coverage import RESPONSE_SLA_MIN
+from modules.allocation_optimizer import FORECAST_HISTORY_WEEKS
+from modules.staffing import hourly_arrival_rates, ON_SCENE_MIN
+
+# Replications per scenario and the smallest batch worth shipping to a worker process
+SIM_REPLICATIONS = 2000
+SIM_MIN_CHUNK = 250
+SIM_MAX_WORKERS = os.cpu_count() or 1
+# Festival days needed before a jurisdiction's own uplift is trusted over the statewide one
+MIN_FESTIVAL_DAYS = 3
+
+SUMMARY_COLUMNS = ["scenario", "units", "calls_per_day", "p50_response_min", "p90_response_min",
+                   "p95_response_min", "mean_wait_min", "wait_probability", "sla_breach_rate"]
+
+
+def festival_uplift(df, jurisdictions, ts_col="call_ts", jurisdiction_col="jurisdiction"):
+    """
+    Calls per festival day / calls per other day, per jurisdiction. A day is a
+    festival day for a jurisdiction if any of its calls that day is flagged
+    is_festival (statewide: any call). Jurisdictions with fewer than
+    MIN_FESTIVAL_DAYS festival days of their own fall back to the statewide ratio.
+    """
+    if "is_festival" not in df.columns:
+        return np.ones(len(jurisdictions))
+    day = pd.to_datetime(df[ts_col], errors="coerce").dt.normalize()
+    keep = (day.notna() & df[jurisdiction_col].notna()).to_numpy()
+    if not keep.any():
+        return np.ones(len(jurisdictions))
+    day = day[keep]
+    flag = pd.to_numeric(df["is_festival"], errors="coerce").fillna(0).to_numpy()[keep] > 0
+
+    first = day.min()
+    d = ((day - first).dt.days).to_numpy(dtype=np.int64)
+    n_days = d.max() + 1
+    n_j = len(jurisdictions)
+    j = pd.Categorical(df[jurisdiction_col][keep].astype(str), categories=jurisdictions).codes.astype(np.int64)
+    counts = np.bincount(j * n_days + d, minlength=n_j * n_days).reshape(-1, n_days)
+    festival_day = np.bincount(j[flag] * n_days + d[flag], minlength=n_j * n_days).reshape(-1, n_days) > 0
+
+    # Statewide: a festival day anywhere
+    any_festival = festival_day.any(axis=0)
+    state_fest, state_other = any_festival.sum(), (~any_festival).sum()
+    if state_fest == 0 or state_other == 0:
+        statewide = 1.0
+    else:
+        statewide = (counts[:, any_festival].sum() / state_fest) / max(counts[:, ~any_festival].sum() / state_other, 1e-9)
+
+    n_fest = festival_day.sum(axis=1)
+    n_other = n_days - n_fest
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fest_rate = np.where(festival_day, counts, 0).sum(axis=1) / n_fest
+        other_rate = np.where(festival_day, 0, counts).sum(axis=1) / n_other
+        uplift = fest_rate / other_rate
+    trusted = (n_fest >= MIN_FESTIVAL_DAYS) & (n_other > 0) & (other_rate > 0)
+    return np.where(trusted, uplift, statewide)
+
+
+def fit_response_model(df, history_weeks=FORECAST_HISTORY_WEEKS, on_scene_min=ON_SCENE_MIN,
+                       jurisdiction_col="jurisdiction"):
+    """
+    Per-jurisdiction inputs for the simulator: hourly arrival rates by hour of
+    week, festival uplift, and the observed travel (response) times to resample.
+    """
+    jurisdictions, rates = hourly_arrival_rates(df, history_weeks=history_weeks)
+    response = (pd.to_numeric(df["response_time_min"], errors="coerce")
+                if "response_time_min" in df.columns else pd.Series(np.nan, index=df.index))
+    response = response.where(response >= 0)
+    statewide = response.dropna().to_numpy()
+    if statewide.size == 0:
+        statewide = np.zeros(1)
+    by_jurisdiction = response.groupby(df[jurisdiction_col].astype(str))
+    travel = {}
+    for name in jurisdictions:
+        samples = by_jurisdiction.get_group(name).dropna().to_numpy() if name in by_jurisdiction.groups else []
+        travel[name] = samples if len(samples) else statewide
+    return {
+        "jurisdictions": jurisdictions,
+        "rates": rates,
+        "festival_uplift": festival_uplift(df, jurisdictions),
+        "travel_min": travel,
+        "on_scene_min": float(on_scene_min),
+    }
+
+
+def _simulate_chunk(hourly_rates, units, travel_min, on_scene_min, replications, seed):
+    """
+    `replications` independent days of one jurisdiction: Poisson arrivals per
+    hour, first-come-first-served dispatch to the unit that frees up first.
+    A unit is busy for travel + on-scene time. Replications run in lockstep
+    as rows of arrays, stepping through calls in arrival order.
+
+    Returns (response minutes, wait minutes) for every simulated call.
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(hourly_rates, size=(replications, len(hourly_rates)))
+    per_rep = counts.sum(axis=1)
+    total = int(per_rep.sum())
+    if total == 0:
+        return np.empty(0), np.empty(0)
+
+    rep = np.repeat(np.arange(replications), per_rep)
+    hour = np.repeat(np.tile(np.arange(len(hourly_rates)), replications), counts.ravel())
+    t = (hour + rng.random(total)) * 60.0
+    order = np.lexsort((t, rep))
+    rep, t = rep[order], t[order]
+    offsets = np.concatenate(([0], np.cumsum(per_rep)[:-1]))
+    pos = np.arange(total) - offsets[rep]
+
+    arrivals = np.full((replications, per_rep.max()), np.inf)
+    arrivals[rep, pos] = t
+    travel = rng.choice(np.asarray(travel_min, dtype=np.float64), size=arrivals.shape)
+    busy = travel + rng.exponential(on_scene_min, size=arrivals.shape) if on_scene_min > 0 else travel
+
+    rows = np.arange(replications)
+    free = np.zeros((replications, units))
+    wait = np.full(arrivals.shape, np.nan)
+    for k in range(arrivals.shape[1]):
+        active = rows[per_rep > k]
+        unit = free[active].argmin(axis=1)
+        start = np.maximum(arrivals[active, k], free[active, unit])
+        free[active, unit] = start + busy[active, k]
+        wait[active, k] = start - arrivals[active, k]
+
+    wait = wait[rep, pos]
+    return wait + travel[rep, pos], wait
+
+
+def _chunks(replications, workers):
+    n = max(1, min(workers, replications // SIM_MIN_CHUNK))
+    return [len(c) for c in np.array_split(np.arange(replications), n)]
+
+
+@st.cache_resource(show_spinner=False)
+def get_simulation_pool(max_workers=SIM_MAX_WORKERS):
+    """One worker pool per process; spawned workers avoid forking Streamlit's threads."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def simulate_day(model, jurisdiction, units, day=0, festival=False,
+                 replications=SIM_REPLICATIONS, seed=0, workers=SIM_MAX_WORKERS, on_scene_min=None):
+    """
+    Response and wait times for `units` units in `jurisdiction` over a day of
+    the week (0 = Mon), with the festival uplift applied if `festival`.
+    Each day starts with every unit free. Replications are split across the
+    process pool when there are enough of them.
+    """
+    if units < 1:
+        raise ValueError("At least one unit is needed to simulate responses")
+    j = model["jurisdictions"].index(jurisdiction)
+    rates = model["rates"][j, day * 24:(day + 1) * 24]
+    if festival:
+        rates = rates * model["festival_uplift"][j]
+    on_scene_min = model["on_scene_min"] if on_scene_min is None else float(on_scene_min)
+    args = (rates, int(units), model["travel_min"][jurisdiction], on_scene_min)
+
+    sizes = _chunks(replications, workers)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if len(sizes) == 1:
+        results = [_simulate_chunk(*args, sizes[0], seeds[0])]
+    else:
+        pool = get_simulation_pool()
+        results = list(pool.map(_simulate_chunk, *zip(*[args + (n, s) for n, s in zip(sizes, seeds)])))
+    response = np.concatenate([r[0] for r in results])
+    wait = np.concatenate([r[1] for r in results])
+    return response, wait
+
+
+def summarize_simulation(response, wait, replications, sla_min=RESPONSE_SLA_MIN):
+    """Percentiles of the simulated response-time distribution and queueing stats."""
+    if response.size == 0:
+        return {"calls_per_day": 0.0, "p50_response_min": np.nan, "p90_response_min": np.nan,
+                "p95_response_min": np.nan, "mean_wait_min": 0.0, "wait_probability": 0.0,
+                "sla_breach_rate": np.nan}
+    p50, p90, p95 = np.percentile(response, [50, 90, 95])
+    return {
+        "calls_per_day": response.size / replications,
+        "p50_response_min": p50,
+        "p90_response_min": p90,
+        "p95_response_min": p95,
+        "mean_wait_min": wait.mean(),
+        "wait_probability": (wait > 1e-9).mean(),
+        "sla_breach_rate": (response > sla_min).mean(),
+    }
+
+
+def compare_scenario(model, jurisdiction, units, extra_units, day=0, festival=False,
+                     replications=SIM_REPLICATIONS, seed=0, workers=SIM_MAX_WORKERS, on_scene_min=None):
+    """
+    Baseline vs `extra_units` more units in one jurisdiction. Both runs share
+    the seed, so they see the same calls and the difference is the units alone.
+    Returns (summary DataFrame, {scenario: response times}).
+    """
+    rows, samples = [], {}
+    for name, n in (("baseline", units), ("scenario", units + extra_units)):
+        response, wait = simulate_day(model, jurisdiction, n, day=day, festival=festival,
+                                      replications=replications, seed=seed, workers=workers,
+                                      on_scene_min=on_scene_min)
+        rows.append({"scenario": name, "units": n, **summarize_simulation(response, wait, replications)})
+        samples[name] = response
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS).round(2), samples
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_response_model(dataset_key, _df, on_scene_min=ON_SCENE_MIN):
+    """fit_response_model cached per dataset."""
+    return fit_response_model(_df, on_scene_min=on_scene_min)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_scenario(dataset_key, _model, jurisdiction, units, extra_units, day=0, festival=False,
+                 replications=SIM_REPLICATIONS, on_scene_min=ON_SCENE_MIN):
+    """compare_scenario cached per dataset and scenario inputs."""
+    return compare_scenario(_model, jurisdiction, units, extra_units, day=day, festival=festival,
+                            replications=replications, on_scene_min=on_scene_min)
@@ -0,0 +1,44 @@
+# modules/shifts.py
+# Map timestamps to duty shifts (SHIFT_WINDOWS), including shifts that wrap past midnight.
+import numpy as np
+import pandas as pd
+from config import SHIFT_WINDOWS
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def shift_hour_lookup(shifts=SHIFT_WINDOWS):
+    """Shift code for each hour 0-23, and whether that hour is the after-midnight part of a shift."""
+    code = np.full(24, -1, dtype=np.int64)
+    wrapped = np.zeros(24, dtype=bool)
+    for i, (start, end) in enumerate(shifts.values()):
+        hours = np.arange(start, end) if start < end else np.r_[np.arange(start, 24), np.arange(0, end)]
+        code[hours] = i
+        if start >= end:
+            wrapped[np.arange(0, end)] = True
+    return code, wrapped
+
+
+def assign_shifts(ts, shifts=SHIFT_WINDOWS):
+    """
+    (shift code, shift date) for each timestamp. Hours after midnight in a
+    wrapping shift belong to the previous day's shift. Code is -1 for hours
+    no shift covers (or missing timestamps).
+    """
+    ts = pd.to_datetime(pd.Series(ts), errors="coerce")
+    code_lut, wrapped_lut = shift_hour_lookup(shifts)
+    hour = ts.dt.hour.fillna(-1).to_numpy(dtype=np.int64)
+    known = hour >= 0
+    code = np.where(known, code_lut[np.clip(hour, 0, 23)], -1)
+    wrapped = known & wrapped_lut[np.clip(hour, 0, 23)]
+    shift_date = ts.dt.normalize() - pd.to_timedelta(wrapped.astype(np.int64), unit="D")
+    return code, shift_date.to_numpy()
+
+
+def shift_bounds(shift_date, shift, shifts=SHIFT_WINDOWS):
+    """(start, end) Timestamps of `shift` on `shift_date`."""
+    start_h, end_h = shifts[shift]
+    day = pd.Timestamp(shift_date).normalize()
+    start = day + pd.Timedelta(hours=start_h)
+    end = day + pd.Timedelta(days=1 if end_h <= start_h else 0, hours=end_h)
+    return start, end
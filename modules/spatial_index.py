@@ -0,0 +1,153 @@
+# modules/spatial_index.py
+# Uniform grid hash over call coordinates for bbox / radius / k-nearest queries.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+EARTH_RADIUS_M = 6371008.8
+# Metres per degree of latitude on the haversine sphere (so search boxes match haversine_m)
+METERS_PER_DEG_LAT = EARTH_RADIUS_M * np.pi / 180.0
+
+# ~550 m cells at Goa's latitude
+DEFAULT_CELL_DEG = 0.005
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Vectorised great-circle distance in metres (inputs in degrees, broadcastable)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def filter_mask(df, date_range=None, categories=None, jurisdictions=None, date_col="date"):
+    """
+    Boolean mask for the dashboard filters (date range, category, jurisdiction).
+    Any argument left as None is not applied. Use it as `mask=` in index queries.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if date_range is not None:
+        dates = pd.to_datetime(df[date_col])
+        mask &= ((dates >= pd.to_datetime(date_range[0])) &
+                 (dates <= pd.to_datetime(date_range[1]))).to_numpy()
+    if categories is not None:
+        mask &= df["category"].isin(categories).to_numpy()
+    if jurisdictions is not None:
+        mask &= df["jurisdiction"].isin(jurisdictions).to_numpy()
+    return mask
+
+
+class CallSpatialIndex:
+    """
+    Grid hash over caller coordinates.
+
+    Points are sorted by cell id (column-major: ix * ny + iy), so every grid
+    column of a bounding box is one contiguous slice found with searchsorted.
+    Queries return positional row indices into the frame the index was built on.
+    """
+
+    def __init__(self, df, lat_col="caller_lat", lon_col="caller_lon", cell_deg=DEFAULT_CELL_DEG):
+        lat = pd.to_numeric(df[lat_col], errors="coerce").to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(df[lon_col], errors="coerce").to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+
+        self.n_rows = len(df)
+        self.cell_deg = float(cell_deg)
+        self.lat = lat
+        self.lon = lon
+
+        if len(valid) == 0:
+            self.lat_min = self.lon_min = 0.0
+            self.nx = self.ny = 1
+            self._order = np.empty(0, dtype=np.int64)
+            self._cells = np.empty(0, dtype=np.int64)
+            return
+
+        self.lat_min = float(lat[valid].min())
+        self.lon_min = float(lon[valid].min())
+        self.nx = int((lon[valid].max() - self.lon_min) // self.cell_deg) + 1
+        self.ny = int((lat[valid].max() - self.lat_min) // self.cell_deg) + 1
+
+        cells = self._cell_ix(lon[valid]) * self.ny + self._cell_iy(lat[valid])
+        order = np.argsort(cells, kind="stable")
+        self._order = valid[order]
+        self._cells = cells[order]
+
+    def __len__(self):
+        return len(self._order)
+
+    def _cell_ix(self, lon):
+        return np.clip(((lon - self.lon_min) // self.cell_deg).astype(np.int64), 0, self.nx - 1)
+
+    def _cell_iy(self, lat):
+        return np.clip(((lat - self.lat_min) // self.cell_deg).astype(np.int64), 0, self.ny - 1)
+
+    def _candidates(self, lat_min, lat_max, lon_min, lon_max):
+        """Row indices in every grid cell touched by the box (superset of the answer)."""
+        if len(self._order) == 0:
+            return np.empty(0, dtype=np.int64)
+        ix0, ix1 = self._cell_ix(np.array([lon_min, lon_max]))
+        iy0, iy1 = self._cell_iy(np.array([lat_min, lat_max]))
+        cols = np.arange(ix0, ix1 + 1, dtype=np.int64) * self.ny
+        starts = np.searchsorted(self._cells, cols + iy0, side="left")
+        ends = np.searchsorted(self._cells, cols + iy1, side="right")
+        if len(starts) == 1:
+            return self._order[starts[0]:ends[0]]
+        return np.concatenate([self._order[s:e] for s, e in zip(starts, ends) if e > s] or
+                              [np.empty(0, dtype=np.int64)])
+
+    @staticmethod
+    def _apply_mask(idx, mask):
+        if mask is None:
+            return idx
+        return idx[np.asarray(mask, dtype=bool)[idx]]
+
+    def bbox(self, lat_min, lat_max, lon_min, lon_max, mask=None):
+        """Rows with lat_min <= lat <= lat_max and lon_min <= lon <= lon_max."""
+        idx = self._candidates(lat_min, lat_max, lon_min, lon_max)
+        lat, lon = self.lat[idx], self.lon[idx]
+        idx = idx[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+        return np.sort(self._apply_mask(idx, mask))
+
+    def radius(self, lat, lon, radius_m, mask=None, return_distance=False):
+        """Rows within `radius_m` metres (haversine) of (lat, lon)."""
+        # Longitude span taken at the box's widest latitude, padded by a cell for edge rounding
+        dlat = radius_m / METERS_PER_DEG_LAT
+        widest = min(abs(lat) + dlat, 90.0)
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(np.cos(np.radians(widest)), 1e-6))
+        dlat, dlon = dlat + self.cell_deg, dlon + self.cell_deg
+        idx = self._apply_mask(self._candidates(lat - dlat, lat + dlat, lon - dlon, lon + dlon), mask)
+        dist = haversine_m(lat, lon, self.lat[idx], self.lon[idx])
+        keep = dist <= radius_m
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(idx)
+        if return_distance:
+            return idx[order], dist[order]
+        return idx[order]
+
+    def nearest(self, lat, lon, k=10, mask=None):
+        """The k closest rows to (lat, lon), nearest first. Returns (indices, distances_m)."""
+        total = len(self._order) if mask is None else int(np.asarray(mask, dtype=bool)[self._order].sum())
+        k = min(int(k), total)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        # Grow the search radius until it holds k rows; those are then exactly the k nearest
+        corner_lat = self.lat_min + np.array([0, 0, self.ny, self.ny]) * self.cell_deg
+        corner_lon = self.lon_min + np.array([0, self.nx, 0, self.nx]) * self.cell_deg
+        farthest_m = float(haversine_m(lat, lon, corner_lat, corner_lon).max())
+        radius_m = self.cell_deg * METERS_PER_DEG_LAT
+        while True:
+            idx, dist = self.radius(lat, lon, radius_m, mask=mask, return_distance=True)
+            if len(idx) >= k or radius_m > farthest_m:
+                break
+            radius_m *= 2.0
+
+        top = np.argsort(dist, kind="stable")[:k]
+        return idx[top], dist[top]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_spatial_index(dataset_key, _df, lat_col="caller_lat", lon_col="caller_lon", cell_deg=DEFAULT_CELL_DEG):
+    """Build the grid index once per dataset (content hash) and reuse it across reruns."""
+    return CallSpatialIndex(_df, lat_col=lat_col, lon_col=lon_col, cell_deg=cell_deg)
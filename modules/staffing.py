@@ -0,0 +1,143 @@
+# modules/staffing.py
+# Erlang-C staffing per jurisdiction x hour of week.
+import numpy as np
+import pandas as pd
+import streamlit as st
+from config import SHIFT_WINDOWS
+from modules.allocation_optimizer import FORECAST_HISTORY_WEEKS
+from modules.shifts import shift_hour_lookup, WEEKDAY_NAMES
+
+# Probability that a call has to wait for a free unit
+TARGET_WAIT_PROBABILITY = 0.2
+# Time on scene added to the response time to get how long a call occupies a unit
+ON_SCENE_MIN = 30.0
+# Safety cap on units per cell
+MAX_UNITS = 200
+
+
+def hourly_arrival_rates(df, history_weeks=FORECAST_HISTORY_WEEKS,
+                         ts_col="call_ts", jurisdiction_col="jurisdiction"):
+    """
+    Calls per hour for each jurisdiction x hour of week (Mon 00:00 = 0) over
+    the last `history_weeks` weeks. Returns (jurisdictions, J x 168 array).
+    """
+    ts = pd.to_datetime(df[ts_col], errors="coerce")
+    keep = (ts.notna() & df[jurisdiction_col].notna()).to_numpy()
+    ts, jurisdiction = ts[keep], df[jurisdiction_col][keep].astype(str)
+    jurisdictions = sorted(jurisdiction.unique().tolist())
+    if ts.empty:
+        return jurisdictions, np.zeros((len(jurisdictions), 168))
+
+    last = ts.max().normalize()
+    first = max(ts.min().normalize(), last - pd.Timedelta(weeks=history_weeks) + pd.Timedelta(days=1))
+    recent = (ts >= first).to_numpy()
+    j = pd.Categorical(jurisdiction[recent], categories=jurisdictions).codes.astype(np.int64)
+    how = (ts[recent].dt.dayofweek * 24 + ts[recent].dt.hour).to_numpy(dtype=np.int64)
+
+    counts = np.bincount(j * 168 + how, minlength=len(jurisdictions) * 168).reshape(-1, 168)
+    occurrences = np.bincount(pd.date_range(first, last, freq="D").dayofweek, minlength=7)
+    return jurisdictions, counts / np.repeat(np.maximum(occurrences, 1), 24)
+
+
+def mean_service_minutes(df, jurisdictions, on_scene_min=ON_SCENE_MIN, jurisdiction_col="jurisdiction"):
+    """
+    Mean minutes a call occupies a unit, per jurisdiction: response time
+    (response_time_min, else response_ts - call_ts) plus time on scene.
+    Jurisdictions without response data use the overall mean.
+    """
+    if "response_time_min" in df.columns:
+        response = pd.to_numeric(df["response_time_min"], errors="coerce")
+    else:
+        response = pd.Series(np.nan, index=df.index)
+    if "response_ts" in df.columns:
+        derived = (pd.to_datetime(df["response_ts"], errors="coerce") -
+                   pd.to_datetime(df["call_ts"], errors="coerce")).dt.total_seconds() / 60.0
+        response = response.fillna(derived.where(derived >= 0))
+
+    per_jurisdiction = response.groupby(df[jurisdiction_col].astype(str)).mean()
+    overall = response.mean()
+    overall = 0.0 if pd.isna(overall) else overall
+    return per_jurisdiction.reindex(jurisdictions).fillna(overall).to_numpy() + on_scene_min
+
+
+def erlang_c_staffing(arrival_rate, service_min, target=TARGET_WAIT_PROBABILITY, max_units=MAX_UNITS):
+    """
+    Minimum units per cell so that the Erlang-C probability of waiting is at
+    most `target`. `arrival_rate` is calls per hour, `service_min` broadcasts
+    against it. All cells step through n = 1, 2, ... together using the
+    Erlang-B recursion; a cell stops once it meets the target.
+
+    Returns (units, offered load in Erlangs, wait probability, mean wait in minutes).
+    """
+    lam = np.asarray(arrival_rate, dtype=np.float64)
+    h = np.broadcast_to(np.asarray(service_min, dtype=np.float64), lam.shape)
+    load = lam * h / 60.0
+
+    units = np.zeros(lam.shape, dtype=np.int64)
+    wait_p = np.zeros(lam.shape)
+    pending = load > 0
+    erlang_b = np.ones(lam.shape)
+    for n in range(1, max_units + 1):
+        if not pending.any():
+            break
+        erlang_b = load * erlang_b / (n + load * erlang_b)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            erlang_c = np.where(n > load, n * erlang_b / (n - load * (1 - erlang_b)), 1.0)
+        done = pending & (erlang_c <= target)
+        units[done] = n
+        wait_p[done] = erlang_c[done]
+        pending &= ~done
+    units[pending] = max_units
+    wait_p[pending] = np.nan
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_wait = np.where(units > load, wait_p * h / (units - load), np.nan)
+    mean_wait = np.where(load > 0, mean_wait, 0.0)
+    return units, load, wait_p, mean_wait
+
+
+def staffing_table(df, target=TARGET_WAIT_PROBABILITY, on_scene_min=ON_SCENE_MIN,
+                   history_weeks=FORECAST_HISTORY_WEEKS):
+    """Erlang-C staffing for every jurisdiction x weekday x hour."""
+    jurisdictions, rates = hourly_arrival_rates(df, history_weeks=history_weeks)
+    service = mean_service_minutes(df, jurisdictions, on_scene_min=on_scene_min)[:, None]
+    units, load, wait_p, mean_wait = erlang_c_staffing(rates, service, target=target)
+
+    n_j = len(jurisdictions)
+    how = np.tile(np.arange(168), n_j)
+    return pd.DataFrame({
+        "jurisdiction": np.repeat(jurisdictions, 168),
+        "day": np.asarray(WEEKDAY_NAMES)[how // 24],
+        "hour": how % 24,
+        "calls_per_hour": rates.ravel().round(3),
+        "service_min": np.repeat(service[:, 0], 168).round(1),
+        "offered_load": load.ravel().round(3),
+        "units_required": units.ravel(),
+        "wait_probability": wait_p.ravel().round(3),
+        "mean_wait_min": mean_wait.ravel().round(2),
+    })
+
+
+def staffing_by_shift(staffing, shifts=SHIFT_WINDOWS):
+    """
+    Units a shift needs: the peak hourly requirement within it. Hours after
+    midnight count towards the previous day's wrapping shift.
+    """
+    code_lut, wrapped_lut = shift_hour_lookup(shifts)
+    hour = staffing["hour"].to_numpy()
+    day = pd.Categorical(staffing["day"], categories=WEEKDAY_NAMES).codes
+    shift_day = (day - wrapped_lut[hour]) % 7
+    cells = staffing.assign(
+        day=np.asarray(WEEKDAY_NAMES)[shift_day],
+        shift=np.asarray(list(shifts) + [None], dtype=object)[code_lut[hour]],
+    ).dropna(subset=["shift"])
+    return (cells.groupby(["jurisdiction", "day", "shift"], sort=False)
+            .agg(units_required=("units_required", "max"), peak_calls_per_hour=("calls_per_hour", "max"))
+            .reset_index())
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_staffing(dataset_key, _df, target=TARGET_WAIT_PROBABILITY, on_scene_min=ON_SCENE_MIN):
+    """Hourly and per-shift Erlang-C staffing, cached per dataset and parameters."""
+    hourly = staffing_table(_df, target=target, on_scene_min=on_scene_min)
+    return {"hourly": hourly, "by_shift": staffing_by_shift(hourly)}
@@ -2,6 +2,8 @@
 from calendar import HTMLCalendar
 from datetime import date
 
+import streamlit as st
+
 class FestivalCalendar(HTMLCalendar):
     def __init__(self, festival_dates_map):
         super().__init__()
@@ -36,4 +38,9 @@ def render_month_calendar(year, month, festival_dates_map):
             th, td { text-align: center; padding: 5px; }
         </style>
     """
-    return st_style + html_cal
\ No newline at end of file
+    return st_style + html_cal
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_month_calendar_html(year, month, calendar_version, _festival_dates_map):
+    """render_month_calendar memoised per (year, month, calendar version)."""
+    return render_month_calendar(year, month, _festival_dates_map)
@@ -2,17 +2,57 @@ import streamlit as st
 import firebase_admin
 from firebase_admin import credentials, firestore
 import json
+import os
 from datetime import datetime
 
-def initialize_firebase():
-    """Initialize Firebase Admin SDK if not already initialized"""
+# Seconds a cached officer profile / username lookup is served before re-reading Firestore
+PROFILE_TTL_S = 300
+# Project used when FIRESTORE_EMULATOR_HOST points at a local emulator
+EMULATOR_PROJECT = os.environ.get("GCLOUD_PROJECT", "demo-goa-police")
+
+@st.cache_resource(show_spinner=False)
+def get_firestore_client():
+    """One Firestore client per process; its gRPC channel is shared by every session."""
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        # The client library talks to the emulator with anonymous credentials
+        return firestore.Client(project=EMULATOR_PROJECT)
     if not firebase_admin._apps:
         key_dict = json.loads(st.secrets["textkey"])
         cred = credentials.Certificate(key_dict)
         firebase_admin.initialize_app(cred)
-    
     return firestore.client()
 
+def initialize_firebase():
+    """Initialize Firebase Admin SDK if not already initialized"""
+    return get_firestore_client()
+
+@st.cache_data(ttl=PROFILE_TTL_S, max_entries=1024, show_spinner=False)
+def _fetch_officer(user_id: str):
+    """Officer document (None if missing); errors propagate and are not cached."""
+    officer_doc = get_firestore_client().collection("police_officers").document(user_id).get()
+    return officer_doc.to_dict() if officer_doc.exists else None
+
+@st.cache_data(ttl=PROFILE_TTL_S, max_entries=1024, show_spinner=False)
+def _username_taken(username: str):
+    return get_firestore_client().collection("usernames").document(username).get().exists
+
+@st.cache_data(ttl=PROFILE_TTL_S, max_entries=1024, show_spinner=False)
+def get_user_profile(username: str):
+    """Dashboard user document from the users collection (None if missing)."""
+    user_doc = get_firestore_client().collection("users").document(username).get()
+    return user_doc.to_dict() if user_doc.exists else None
+
+def invalidate_user_profile(username: str):
+    """Drop a cached users/<username> document after it is written."""
+    get_user_profile.clear(username)
+
+def invalidate_officer_cache(user_id: str = None, username: str = None):
+    """Drop cached entries after a write so the next read sees it."""
+    if user_id is not None:
+        _fetch_officer.clear(user_id)
+    if username is not None:
+        _username_taken.clear(username)
+
 def store_police_officer_data(user_id: str, first_name: str, last_name: str, rank: str, 
                              badge_number: str, department: str, synthetic_email: str):
     """Store police officer data in Firestore"""
@@ -48,6 +88,7 @@ def store_police_officer_data(user_id: str, first_name: str, last_name: str, ran
             "rank": rank,
             "created_at": datetime.now()
         })
+        invalidate_officer_cache(user_id=user_id, username=username)
         
         return {"success": True, "message": "Police officer data stored successfully"}
     
@@ -57,13 +98,10 @@ def store_police_officer_data(user_id: str, first_name: str, last_name: str, ran
 def get_police_officer_data(user_id: str):
     """Retrieve police officer data from Firestore"""
     try:
-        db = initialize_firebase()
+        data = _fetch_officer(user_id)
         
-        officer_ref = db.collection("police_officers").document(user_id)
-        officer_doc = officer_ref.get()
-        
-        if officer_doc.exists:
-            return {"success": True, "data": officer_doc.to_dict()}
+        if data is not None:
+            return {"success": True, "data": data}
         else:
             return {"success": False, "error": "Police officer not found"}
     
@@ -80,6 +118,7 @@ def update_last_login(user_id: str):
             "last_login": datetime.now(),
             "login_count": firestore.Increment(1)
         })
+        invalidate_officer_cache(user_id=user_id)
         
         return {"success": True}
     
@@ -89,13 +128,9 @@ def update_last_login(user_id: str):
 def check_username_availability(first_name: str, last_name: str, rank: str):
     """Check if the name-rank combination is already taken"""
     try:
-        db = initialize_firebase()
         username = f"{first_name.lower()}.{last_name.lower()}.{rank.lower()}"
         
-        username_ref = db.collection("usernames").document(username)
-        username_doc = username_ref.get()
-        
-        return not username_doc.exists  # True if available, False if taken
+        return not _username_taken(username)  # True if available, False if taken
     
     except Exception as e:
         return False  # Assume not available on error